@@ -0,0 +1,67 @@
+"""
+Compare compacted and full prompts on the fixed local corpus: tokens sent,
+per-call latency, and how close the summaries from compacted prompts are to
+the ones from full prompts. Without --live only token counts are reported.
+
+    python -m benchmarks.compaction_benchmark --live
+"""
+import argparse
+import time
+import pandas as pd
+from benchmarks.corpus import load_corpus, unigram_f1
+from processors.compaction import compact_text, PROMPT_TOKEN_BUDGET
+from processors.llm_client import LLMClient, estimate_tokens
+from processors.summarizer import build_abs_prompt
+
+
+def summarize_timed(client, prompts):
+    """Summaries and per-call latencies, one prompt at a time so latencies don't overlap"""
+    summaries, latencies = [], []
+    for prompt in prompts:
+        started = time.perf_counter()
+        summaries.append(client.generate(prompt).strip())
+        latencies.append(time.perf_counter() - started)
+    return summaries, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type=int, default=PROMPT_TOKEN_BUDGET,
+                        help="article token budget; defaults to the one the pipeline uses")
+    parser.add_argument('--live', action='store_true', help="also call Gemini with both prompt sets")
+    args = parser.parse_args()
+
+    texts = load_corpus()['content'].tolist()
+    prompts = {
+        'full': [build_abs_prompt(text) for text in texts],
+        'compacted': [build_abs_prompt(compact_text(text, args.budget)) for text in texts],
+    }
+
+    rows = {}
+    for name, mode_prompts in prompts.items():
+        tokens = [estimate_tokens(prompt) for prompt in mode_prompts]
+        rows[name] = {
+            'prompts': name,
+            'articles': len(texts),
+            'mean prompt tokens': round(sum(tokens) / len(tokens)),
+            'total prompt tokens': sum(tokens),
+        }
+
+    if args.live:
+        # No cache, so every call reaches the API
+        client = LLMClient()
+        summaries = {}
+        for name, mode_prompts in prompts.items():
+            summaries[name], latencies = summarize_timed(client, mode_prompts)
+            rows[name]['mean latency (s)'] = round(sum(latencies) / len(latencies), 2)
+            rows[name]['rouge-1 f1 vs article'] = round(
+                sum(map(unigram_f1, summaries[name], texts)) / len(texts), 3)
+
+        agreement = sum(map(unigram_f1, summaries['compacted'], summaries['full'])) / len(texts)
+        rows['compacted']['rouge-1 f1 vs full summary'] = round(agreement, 3)
+
+    print(pd.DataFrame(list(rows.values())).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
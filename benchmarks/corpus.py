@@ -0,0 +1,33 @@
+import json
+import os
+import re
+import pandas as pd
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'corpus.jsonl')
+
+
+def load_corpus(path=CORPUS_PATH, repeat=1):
+    """The fixed benchmark articles as a DataFrame, optionally repeated to scale the workload"""
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    df = pd.DataFrame(records * repeat)
+    df['id'] = range(len(df))
+    return df
+
+
+def unigram_f1(candidate, reference):
+    """ROUGE-1 style F1 between two texts"""
+    candidate_words = re.findall(r'\w+', candidate.lower())
+    reference_words = re.findall(r'\w+', reference.lower())
+    if not candidate_words or not reference_words:
+        return 0.0
+
+    reference_counts = pd.Series(reference_words).value_counts()
+    candidate_counts = pd.Series(candidate_words).value_counts()
+    overlap = candidate_counts.combine(reference_counts, min, fill_value=0).sum()
+
+    precision = overlap / len(candidate_words)
+    recall = overlap / len(reference_words)
+    return 0.0 if overlap == 0 else 2 * precision * recall / (precision + recall)
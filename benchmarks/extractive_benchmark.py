@@ -0,0 +1,60 @@
+"""
+Compare the native NumPy/SciPy extractive engine against the sumy LSA path
+on the fixed local corpus: wall time, and how much the chosen sentences agree.
+
+    python -m benchmarks.extractive_benchmark --repeat 20
+"""
+import argparse
+import time
+import pandas as pd
+from benchmarks.corpus import load_corpus, unigram_f1
+from processors.extractive import summarize_batch, split_sentences
+from processors.summarizer import summarize_ext, summarize_ext_batch
+
+
+def sentence_jaccard(a, b):
+    a, b = set(split_sentences(a)), set(split_sentences(b))
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def timed(fn, texts):
+    started = time.perf_counter()
+    summaries = fn(texts)
+    return summaries, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=10, help="copies of the corpus to summarize")
+    parser.add_argument('--sentences', type=int, default=5)
+    args = parser.parse_args()
+
+    texts = load_corpus(repeat=args.repeat)['content'].tolist()
+    n = args.sentences
+
+    engines = {
+        'sumy': lambda t: [summarize_ext(text, sentence_count=n) for text in t],
+        'sumy (process pool)': lambda t: summarize_ext_batch(t, sentence_count=n),
+        'native svd': lambda t: summarize_batch(t, sentence_count=n, method='svd'),
+        'native textrank': lambda t: summarize_batch(t, sentence_count=n, method='textrank'),
+    }
+
+    results = {name: timed(fn, texts) for name, fn in engines.items()}
+    reference = results['sumy'][0]
+
+    rows = []
+    for name, (summaries, seconds) in results.items():
+        rows.append({
+            'engine': name,
+            'articles': len(texts),
+            'seconds': round(seconds, 3),
+            'articles/sec': round(len(texts) / seconds, 1),
+            'sentence jaccard vs sumy': round(sum(map(sentence_jaccard, summaries, reference)) / len(texts), 3),
+            'rouge-1 f1 vs sumy': round(sum(map(unigram_f1, summaries, reference)) / len(texts), 3),
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import random
+import re
+from types import SimpleNamespace
+from google.api_core import exceptions as google_exceptions
+from processors.llm_client import estimate_tokens
+
+
+ARTICLE_PATTERN = re.compile(r'<article id="([^"]+)">\n(.*?)\n</article>', re.DOTALL)
+
+
+def lead(text, sentences=2):
+    """First few sentences, standing in for a summary"""
+    return " ".join(re.split(r'(?<=[.!?])\s+', text.strip())[:sentences])
+
+
+class FakeGeminiModel:
+    """
+    Deterministic stand-in for genai.GenerativeModel, passed to LLMClient as
+    `model`. Each call sleeps base latency plus a per-token cost plus seeded
+    jitter, and a seeded fraction of calls fail with a 429 that asks the
+    client to retry after `retry_after` seconds. Batched prompts get a JSON
+    object with one summary per article id, so the batch parser is exercised.
+    """
+
+    def __init__(self, latency=0.3, per_token=0.0002, jitter=0.05, error_rate=0.0, retry_after=0.5, seed=0):
+        self.latency = latency
+        self.per_token = per_token
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+        self.calls = 0
+        self.rate_limited = 0
+        self.tokens_sent = 0
+
+    def respond(self, prompt):
+        articles = ARTICLE_PATTERN.findall(prompt)
+        if articles:
+            return json.dumps({article_id: lead(text) for article_id, text in articles})
+
+        article = prompt.split("Article:\n", 1)[-1].rsplit("\n\nSummary:", 1)[0]
+        return lead(article)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        prompt_tokens = estimate_tokens(prompt)
+        self.tokens_sent += prompt_tokens
+
+        # Draw both numbers up front so the sequence does not depend on which calls fail
+        failed = self.random.random() < self.error_rate
+        delay = self.latency + self.per_token * prompt_tokens + self.random.uniform(0, self.jitter)
+
+        if failed:
+            self.rate_limited += 1
+            await asyncio.sleep(self.latency / 10)
+            raise google_exceptions.ResourceExhausted(f"Quota exceeded, retry in {self.retry_after}s")
+
+        await asyncio.sleep(delay)
+        text = self.respond(prompt)
+        usage = SimpleNamespace(total_token_count=prompt_tokens + estimate_tokens(text))
+        return SimpleNamespace(text=text, usage_metadata=usage)
@@ -0,0 +1,143 @@
+"""
+Summarization throughput on the fixed local corpus without spending Gemini
+quota. Abstractive scenarios run the real LLMClient (quota limiters, retries,
+batching) against FakeGeminiModel; extractive scenarios run the real engines.
+Each scenario runs in a fresh process so peak RSS is its own.
+
+Latency percentiles are per Gemini request (queueing and retries included)
+for abstractive scenarios and per chunk of articles for extractive ones.
+
+    python -m benchmarks.summarize_benchmark --repeat 20 --error-rate 0.05
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.corpus import load_corpus
+from benchmarks.fake_gemini import FakeGeminiModel
+from processors.llm_client import LLMClient, MAX_IN_FLIGHT
+
+
+SCENARIOS = {
+    'abstractive (batched)': ('abstractive', {'batched': True}),
+    'abstractive (per article)': ('abstractive', {'batched': False}),
+    'extractive (native)': ('extractive', {'engine': 'native'}),
+    'extractive (sumy)': ('extractive', {'engine': 'sumy'}),
+}
+
+
+class TimedClient(LLMClient):
+    """LLMClient that records how long each request took, retries and quota waits included"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+
+    async def agenerate(self, prompt, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().agenerate(prompt, **kwargs)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+
+def summarize_chunk(kind, options, texts, client, compact):
+    """Summaries for one chunk, through the same functions summarize_articles uses"""
+    from processors.extractive import summarize_batch
+    from processors.summarizer import summarize_abs_articles, summarize_ext_batch
+
+    if kind == 'abstractive':
+        return summarize_abs_articles(texts, client, batched=options['batched'], compact=compact, backend='gemini')
+    if options['engine'] == 'native':
+        return summarize_batch(texts.tolist(), sentence_count=5)
+    return summarize_ext_batch(texts, sentence_count=5)
+
+
+def run_scenario(name, args):
+    kind, options = SCENARIOS[name]
+    df = load_corpus(repeat=args['repeat'])
+
+    client = model = None
+    if kind == 'abstractive':
+        model = FakeGeminiModel(
+            latency=args['latency'],
+            per_token=args['per_token'],
+            jitter=args['jitter'],
+            error_rate=args['error_rate'],
+            retry_after=args['retry_after'],
+        )
+        client = TimedClient(
+            model_name='fake-gemini',
+            model=model,
+            requests_per_minute=args['rpm'],
+            tokens_per_minute=args['tpm'],
+            max_in_flight=args['max_in_flight'],
+        )
+
+    chunk_seconds, summarized = [], 0
+    started = time.perf_counter()
+    for start in range(0, len(df), args['chunk_size']):
+        texts = df['content'].iloc[start:start + args['chunk_size']]
+        chunk_started = time.perf_counter()
+        summaries = summarize_chunk(kind, options, texts, client, args['compact'])
+        chunk_seconds.append(time.perf_counter() - chunk_started)
+        summarized += sum(bool(summary) for summary in summaries if isinstance(summary, str))
+    seconds = time.perf_counter() - started
+
+    latencies = client.latencies if client else chunk_seconds
+    return {
+        'scenario': name,
+        'articles': len(df),
+        'summarized': summarized,
+        'seconds': round(seconds, 2),
+        'articles/sec': round(len(df) / seconds, 1),
+        'p50 latency (s)': round(float(np.percentile(latencies, 50)), 3),
+        'p95 latency (s)': round(float(np.percentile(latencies, 95)), 3),
+        'requests': model.calls if model else 0,
+        '429s': model.rate_limited if model else 0,
+        'tokens sent': model.tokens_sent if model else 0,
+        # ru_maxrss is in KB on Linux
+        'peak RSS (MB)': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+        'peak worker RSS (MB)': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024),
+    }
+
+
+def run_in_child(name, args, results):
+    try:
+        results.put(run_scenario(name, args))
+    except Exception as e:
+        results.put({'scenario': name, 'error': repr(e)})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=10, help="copies of the corpus to summarize")
+    parser.add_argument('--chunk-size', type=int, default=50, help="articles per summarize call, as in main.py")
+    parser.add_argument('--no-compact', dest='compact', action='store_false', help="send full article text")
+    parser.add_argument('--latency', type=float, default=0.3, help="fake Gemini base seconds per call")
+    parser.add_argument('--per-token', type=float, default=0.0002, help="fake Gemini extra seconds per prompt token")
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of calls answered with a 429")
+    parser.add_argument('--retry-after', type=float, default=0.5, help="seconds the fake 429s ask the client to wait")
+    parser.add_argument('--rpm', type=int, default=600)
+    parser.add_argument('--tpm', type=int, default=1_000_000)
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    for name in args.scenarios:
+        results = context.Queue()
+        process = context.Process(target=run_in_child, args=(name, vars(args), results))
+        process.start()
+        rows.append(results.get())
+        process.join()
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,64 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from config import USER, PASSWORD, HOST, PORT, DBNAME
 
 
+def ensure_schema():
+    """Add columns and tables the pipeline relies on that older databases may lack"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor()
+    cursor.execute("""
+        ALTER TABLE news_pipeline ADD COLUMN IF NOT EXISTS siblings TEXT[]
+    """)
+    cursor.execute("""
+        ALTER TABLE news_pipeline
+            ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'new',
+            ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ
+    """)
+    # Rows summarized before the status column existed are already done
+    cursor.execute("""
+        UPDATE news_pipeline SET status = 'done'
+        WHERE status = 'new' AND ext_summary IS NOT NULL
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS source_watermarks (
+            source TEXT PRIMARY KEY,
+            last_published TIMESTAMPTZ NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS article_embeddings (
+            url TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            model TEXT NOT NULL,
+            embedding BYTEA NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute("""
+        ALTER TABLE cluster_summaries
+            ADD COLUMN IF NOT EXISTS member_fingerprint TEXT,
+            ADD COLUMN IF NOT EXISTS sample_fingerprint TEXT
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cluster_models (
+            method TEXT PRIMARY KEY,
+            model BYTEA NOT NULL,
+            fitted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    connection.commit()
+    
+    cursor.close()
+    connection.close()
+
+
 # def insert_raw_articles(df):
 #     connection = psycopg2.connect(
 #         user=USER,
@@ -67,8 +125,8 @@ def insert_raw_articles(df):
         for _, row in df.iterrows():
             try:
                 cursor.execute("""
-                    INSERT INTO news_pipeline (title, author, source, description, url, publish_date, content, source_bias, top)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    INSERT INTO news_pipeline (title, author, source, description, url, publish_date, content, source_bias, top, siblings)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     ON CONFLICT (url) DO NOTHING
                 """, (
                     row['title'],
@@ -79,7 +137,8 @@ def insert_raw_articles(df):
                     row['publish_date'],
                     row['content'],
                     row['source_bias'],
-                    row['top']
+                    row['top'],
+                    row.get('siblings')
                 ))
                 connection.commit()
             except Exception as e:
@@ -91,6 +150,125 @@ def insert_raw_articles(df):
         connection.close()
     
 
+def add_article_siblings(sibling_map):
+    """
+    Append near-duplicate urls to already stored canonical articles, given
+    {canonical_url: (sibling urls, any sibling top)}. A canonical that gains a
+    top sibling becomes top itself, and goes back to the summarization queue
+    if it was already summarized without an abstractive summary.
+    """
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor()
+    for url, (siblings, top) in sibling_map.items():
+        cursor.execute("""
+            UPDATE news_pipeline
+            SET siblings = COALESCE(siblings, ARRAY[]::TEXT[]) || %s::TEXT[],
+                top = top OR %s,
+                status = CASE
+                    WHEN %s AND top IS NOT TRUE AND status = 'done' AND abs_summary IS NULL THEN 'new'
+                    ELSE status
+                END
+            WHERE url = %s
+        """, (siblings, top, top, url))
+    connection.commit()
+    
+    cursor.close()
+    connection.close()
+
+
+def get_known_urls():
+    """Every url already in news_pipeline, near-duplicate siblings included, loaded in one query"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT url FROM news_pipeline
+        UNION
+        SELECT unnest(siblings) FROM news_pipeline
+    """)
+    known_urls = {row[0] for row in cursor.fetchall()}
+    
+    cursor.close()
+    connection.close()
+    return known_urls
+
+
+def get_stored_contents():
+    """(url, content) of every stored article, for seeding the near-duplicate index"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor()
+    cursor.execute("SELECT url, content FROM news_pipeline WHERE content IS NOT NULL")
+    contents = cursor.fetchall()
+    
+    cursor.close()
+    connection.close()
+    return contents
+
+
+def get_source_watermarks():
+    """{source: newest publish_date ingested} for every source fetched before"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor()
+    cursor.execute("SELECT source, last_published FROM source_watermarks")
+    watermarks = dict(cursor.fetchall())
+    
+    cursor.close()
+    connection.close()
+    return watermarks
+
+
+def update_source_watermarks(watermarks):
+    """Advance per-source watermarks; a watermark never moves backwards"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor()
+    for source, last_published in watermarks.items():
+        cursor.execute("""
+            INSERT INTO source_watermarks (source, last_published)
+            VALUES (%s, %s)
+            ON CONFLICT (source) DO UPDATE SET
+                last_published = GREATEST(source_watermarks.last_published, EXCLUDED.last_published),
+                updated_at = now()
+        """, (source, last_published))
+    connection.commit()
+    
+    cursor.close()
+    connection.close()
+
+
 def get_all_articles():
     connection = psycopg2.connect(
         user=USER,
@@ -110,6 +288,54 @@ def get_all_articles():
     return df
 
 
+def get_embeddings(urls, model):
+    """{url: (content_hash, float32 bytes)} for the stored embeddings of `urls` made by `model`"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT url, content_hash, embedding FROM article_embeddings
+        WHERE model = %s AND url = ANY(%s)
+    """, (model, list(urls)))
+    embeddings = {url: (content_hash, embedding) for url, content_hash, embedding in cursor.fetchall()}
+    
+    cursor.close()
+    connection.close()
+    return embeddings
+
+
+def upsert_embeddings(rows, model):
+    """Store (url, content_hash, float32 bytes) rows, replacing older embeddings of the same url"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor()
+    psycopg2.extras.execute_batch(cursor, """
+        INSERT INTO article_embeddings (url, content_hash, model, embedding)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (url) DO UPDATE SET
+            content_hash = EXCLUDED.content_hash,
+            model = EXCLUDED.model,
+            embedding = EXCLUDED.embedding,
+            updated_at = now()
+    """, [(url, content_hash, model, psycopg2.Binary(embedding)) for url, content_hash, embedding in rows])
+    connection.commit()
+    
+    cursor.close()
+    connection.close()
+
+
 def get_unprocessed_articles():
     connection = psycopg2.connect(
         user=USER,
@@ -122,9 +348,7 @@ def get_unprocessed_articles():
     query = """
     SELECT *
     FROM news_pipeline
-    WHERE abs_summary IS NULL
-      AND ext_summary IS NULL
-      AND cluster_label IS NULL
+    WHERE status <> 'done'
     ORDER BY publish_date DESC
     LIMIT 500;
     """
@@ -133,7 +357,45 @@ def get_unprocessed_articles():
     connection.close()
     return df
 
-def remove_unprocessed_articles():
+
+def claim_unprocessed_articles(limit=50, stale_after='1 hour'):
+    """
+    Mark up to `limit` unprocessed articles as claimed and return them. Claims
+    older than `stale_after` (left by a crashed run) are picked up again.
+    """
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cursor.execute("""
+        UPDATE news_pipeline
+        SET status = 'claimed', claimed_at = now()
+        WHERE url IN (
+            SELECT url
+            FROM news_pipeline
+            WHERE status = 'new'
+               OR (status = 'claimed' AND claimed_at < now() - %s::INTERVAL)
+            ORDER BY publish_date DESC
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+    """, (stale_after, limit))
+    rows = cursor.fetchall()
+    connection.commit()
+    
+    cursor.close()
+    connection.close()
+    return pd.DataFrame([dict(row) for row in rows])
+
+
+def requeue_failed_articles():
+    """Give articles whose summarization failed on an earlier run another try"""
     connection = psycopg2.connect(
         user=USER,
         password=PASSWORD,
@@ -144,10 +406,8 @@ def remove_unprocessed_articles():
     
     cursor = connection.cursor()
     cursor.execute("""
-        DELETE FROM news_pipeline
-        WHERE abs_summary IS NULL
-          AND ext_summary IS NULL
-          AND cluster_label IS NULL
+        UPDATE news_pipeline SET status = 'new', claimed_at = NULL
+        WHERE status = 'failed'
     """)
     connection.commit()
     
@@ -155,7 +415,14 @@ def remove_unprocessed_articles():
     connection.close()
 
 
-def insert_articles(df):
+def update_article_summaries(df):
+    """
+    Write summaries and status for a processed chunk back in one transaction.
+    A missing abs_summary keeps the stored one, so summaries generated on
+    demand survive the row being processed again.
+    """
+    df = df.where(pd.notnull(df), None)
+    
     connection = psycopg2.connect(
         user=USER,
         password=PASSWORD,
@@ -165,58 +432,72 @@ def insert_articles(df):
     )
     
     cursor = connection.cursor()
-        
-    for _, row in df.iterrows():
-        title = row['title']
-        author = row['author']
-        source = row['source']
-        description = row['description']
-        url = row['url']
-        publish_date = row['publish_date']
-        content = row['content']
-        source_bias = row['source_bias']
-        top = row['top']
-        abs_summary = row['abs_summary']
-        cluster_label = row['cluster_label']
-        embedding = row['embedding']
-        ext_summary = row['ext_summary']
+    psycopg2.extras.execute_batch(cursor, """
+        UPDATE news_pipeline
+        SET abs_summary = COALESCE(%s, abs_summary),
+            ext_summary = %s,
+            status = %s,
+            claimed_at = NULL
+        WHERE url = %s
+    """, [
+        (
+            row['abs_summary'],
+            row['ext_summary'],
+            row['status'],
+            row['url']
+        )
+        for _, row in df.iterrows()
+    ])
+    connection.commit()
     
-        cursor.execute("""
-            INSERT INTO news_pipeline (title, author, source, description, url, publish_date, content, source_bias, top, abs_summary, cluster_label, embedding, ext_summary)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (url) DO NOTHING
-        """, (
-            title,
-            author,
-            source,
-            description,
-            url,
-            publish_date,
-            content,
-            source_bias,
-            top,
-            abs_summary,
-            cluster_label,
-            embedding,
-            ext_summary
-        ))
-        
-        connection.commit()
-        
+    cursor.close()
+    connection.close()
+
+
+def update_abs_summary(url, abs_summary):
+    """Store a summary generated on demand, unless another one got there first"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
     
-    # Delete extra articles
+    cursor = connection.cursor()
+    cursor.execute("""
+        UPDATE news_pipeline SET abs_summary = %s
+        WHERE url = %s AND abs_summary IS NULL
+    """, (abs_summary, url))
+    connection.commit()
     
+    cursor.close()
+    connection.close()
+
 
+def prune_old_articles():
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor()
     cursor.execute("""
         DELETE FROM news_pipeline
         WHERE publish_date < NOW() - INTERVAL '4 days'
     """)
+    cursor.execute("""
+        DELETE FROM article_embeddings e
+        WHERE NOT EXISTS (SELECT 1 FROM news_pipeline n WHERE n.url = e.url)
+    """)
     connection.commit()
     
     cursor.close()
     connection.close()
     
-    
 
 def replace_articles(df):
     connection = psycopg2.connect(
@@ -249,10 +530,12 @@ def replace_articles(df):
             cluster_label = row['cluster_label']
             embedding = row['embedding']
             ext_summary = row['ext_summary']
+            siblings = row.get('siblings')
+            status = row.get('status', 'done')
         
             cursor.execute("""
-                INSERT INTO news_pipeline (title, author, source, description, url, publish_date, content, source_bias, top, abs_summary, cluster_label, embedding, ext_summary)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                INSERT INTO news_pipeline (title, author, source, description, url, publish_date, content, source_bias, top, abs_summary, cluster_label, embedding, ext_summary, siblings, status)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """, (
                 title,
                 author,
@@ -266,7 +549,9 @@ def replace_articles(df):
                 abs_summary,
                 cluster_label,
                 embedding,
-                ext_summary
+                ext_summary,
+                siblings,
+                status
             ))
         
         # Commit all changes at once
@@ -283,7 +568,10 @@ def replace_articles(df):
         connection.close()
 
 
-def insert_cluster_summary(cluster_label, summary_text):
+def update_article_clusters(df):
+    """Write cluster labels and clustering embeddings for the given articles in one transaction"""
+    df = df.where(pd.notnull(df), None)
+    
     connection = psycopg2.connect(
         user=USER,
         password=PASSWORD,
@@ -291,21 +579,125 @@ def insert_cluster_summary(cluster_label, summary_text):
         port=PORT,
         dbname=DBNAME
     )
+    
+    cursor = connection.cursor()
+    psycopg2.extras.execute_batch(cursor, """
+        UPDATE news_pipeline SET cluster_label = %s, embedding = %s
+        WHERE url = %s
+    """, [(row['cluster_label'], row['embedding'], row['url']) for _, row in df.iterrows()])
+    connection.commit()
+    
+    cursor.close()
+    connection.close()
 
+
+def get_cluster_model(method):
+    """The pickled cluster model saved by the last full fit with `method`, or None"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
+    cursor = connection.cursor()
+    cursor.execute("SELECT model FROM cluster_models WHERE method = %s", (method,))
+    row = cursor.fetchone()
+    
+    cursor.close()
+    connection.close()
+    return bytes(row[0]) if row else None
+
+
+def save_cluster_model(method, model):
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+    
     cursor = connection.cursor()
     cursor.execute("""
-        INSERT INTO cluster_summaries (cluster_label, summary_text)
+        INSERT INTO cluster_models (method, model)
         VALUES (%s, %s)
+        ON CONFLICT (method) DO UPDATE SET
+            model = EXCLUDED.model,
+            fitted_at = now()
+    """, (method, psycopg2.Binary(model)))
+    connection.commit()
+    
+    cursor.close()
+    connection.close()
+
+
+def insert_cluster_summary(cluster_label, summary_text, member_fingerprint=None, sample_fingerprint=None):
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+
+    cursor = connection.cursor()
+    cursor.execute("""
+        INSERT INTO cluster_summaries (cluster_label, summary_text, member_fingerprint, sample_fingerprint)
+        VALUES (%s, %s, %s, %s)
         ON CONFLICT (cluster_label) DO UPDATE SET
             summary_text = EXCLUDED.summary_text,
+            member_fingerprint = EXCLUDED.member_fingerprint,
+            sample_fingerprint = EXCLUDED.sample_fingerprint,
             generated_at = now()
-    """, (cluster_label, summary_text))
+    """, (cluster_label, summary_text, member_fingerprint, sample_fingerprint))
 
     connection.commit()
     cursor.close()
     connection.close()
 
 
+def get_cluster_fingerprints():
+    """{cluster_label: (member_fingerprint, sample_fingerprint)} for every stored cluster summary"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+
+    cursor = connection.cursor()
+    cursor.execute("SELECT cluster_label, member_fingerprint, sample_fingerprint FROM cluster_summaries")
+    fingerprints = {label: (members, sample) for label, members, sample in cursor.fetchall()}
+
+    cursor.close()
+    connection.close()
+    return fingerprints
+
+
+def update_cluster_fingerprints(fingerprints):
+    """Record new fingerprints for summaries kept as they are, {cluster_label: (member_fingerprint, sample_fingerprint)}"""
+    connection = psycopg2.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        port=PORT,
+        dbname=DBNAME
+    )
+
+    cursor = connection.cursor()
+    psycopg2.extras.execute_batch(cursor, """
+        UPDATE cluster_summaries SET member_fingerprint = %s, sample_fingerprint = %s
+        WHERE cluster_label = %s
+    """, [(members, sample, label) for label, (members, sample) in fingerprints.items()])
+    connection.commit()
+
+    cursor.close()
+    connection.close()
+
+
 def get_cluster_summary(cluster_label):
     connection = psycopg2.connect(
         user=USER,
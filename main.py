@@ -1,34 +1,47 @@
 import argparse
 from retrievers.fetcher import fetch_articles
-from processors.summarizer import summarize_articles
+from processors.summarizer import summarize_articles, make_ext_pool, ABS_BACKEND
 from processors.clusterer import cluster_articles
+from processors.llm_client import report_cache
 # from processors.bias_classifier import classify_bias
-from database.db_client import get_unprocessed_articles, remove_unprocessed_articles, insert_articles
+from database.db_client import ensure_schema, claim_unprocessed_articles, requeue_failed_articles, update_article_summaries, prune_old_articles
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--fetch-only', action='store_true')
     parser.add_argument('--process-only', action='store_true')
+    parser.add_argument('--chunk-size', type=int, default=50)
+    parser.add_argument('--abs-backend', choices=['gemini', 'local', 'auto'], default=ABS_BACKEND)
+    parser.add_argument('--refit-clusters', action='store_true', help="refit the cluster model on every article")
     args = parser.parse_args()
     
+    ensure_schema()
+    
     if args.fetch_only or not args.process_only:
         print("Fetching articles...")
         fetch_articles()
     
     if args.process_only or not args.fetch_only:
         print("Processing articles...")
-        df = get_unprocessed_articles()
-        print("Summarizing articles...")
-        df = summarize_articles(df)
-        # print("Classifying articles...")
-        # df = classify_bias(df)
-        print("Removing unprocessed articles...")
-        remove_unprocessed_articles()
-        print("Inserting articles...")
-        insert_articles(df)
+        requeue_failed_articles()
+        # Each chunk is committed as soon as it is summarized, so a rerun resumes where this one stopped.
+        # One extractive pool serves every chunk.
+        with make_ext_pool() as ext_pool:
+            while True:
+                df = claim_unprocessed_articles(limit=args.chunk_size)
+                if df.empty:
+                    break
+                print(f"Summarizing {len(df)} articles...")
+                df = summarize_articles(df, backend=args.abs_backend, ext_pool=ext_pool)
+                # print("Classifying articles...")
+                # df = classify_bias(df)
+                update_article_summaries(df)
+        print("Removing old articles...")
+        prune_old_articles()
         print("Clustering articles...")
-        cluster_articles()
+        cluster_articles(refit=args.refit_clusters)
+        report_cache()
         
 if __name__ == "__main__":
     main()
\ No newline at end of file
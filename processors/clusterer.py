@@ -1,159 +1,398 @@
+import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
 from sklearn.cluster import KMeans, DBSCAN
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
-from config import GOOGLE_API_KEY
-import google.generativeai as genai
-import time
-from database.db_client import get_all_articles, replace_articles, insert_cluster_summary
+from processors.llm_client import get_client, parse_json_object
+from processors.embeddings import embed_texts
+from database.db_client import get_all_articles, update_article_clusters, get_cluster_model, save_cluster_model, insert_cluster_summary, get_cluster_fingerprints, update_cluster_fingerprints
 import hdbscan
-import re
-import ast
+import hashlib
+import pickle
+from importlib.metadata import version
 
 
+# Incremental clustering settings
+DRIFT_THRESHOLD = 1.3     # KMeans: refit when new articles average this many times the fit-time centroid distance
+OUTLIER_THRESHOLD = 0.3   # HDBSCAN: refit when more than this fraction of new articles are noise
+MODEL_LIBRARIES = ('scikit-learn', 'hdbscan', 'numpy')   # a saved model is refit when any of these changed version
 
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel("gemini-2.5-flash")
+# Cluster matching settings, for keeping labels and summaries across a refit
+MATCH_SIMILARITY = 0.9    # minimum cosine similarity between a new and a previous cluster's centroid
+MATCH_JACCARD = 0.5       # minimum overlap between their member sets
+RESUMMARIZE_JACCARD = 0.8 # matched clusters overlapping less than this get a new summary instead of inheriting one
 
+# Labelling settings
+LABEL_SAMPLE_SIZE = 8     # articles closest to each centroid shown to Gemini
+LABEL_TEXT_CHARS = 300
+SUMMARY_SAMPLE_SIZE = 8   # articles shown to Gemini per cluster summary
 
-def clean_labels(output_str):
-    """Safely extract dictionary from Gemini's response"""
-    
-    # Remove markdown code blocks
-    cleaned = re.sub(r'```python\s*', '', output_str)
-    cleaned = re.sub(r'```\s*$', '', cleaned)
-    cleaned = cleaned.strip()
-    
-    try:
-        # Use ast.literal_eval for safety (won't execute arbitrary code)
-        mapping_dict = ast.literal_eval(cleaned)
-        return mapping_dict
-    except (ValueError, SyntaxError) as e:
-        print(f"Error parsing dictionary: {e}")
-        print(f"Cleaned text: {cleaned}")
-        return None
-    
-    
-def label_cluster(texts):
-    prompt = (
+
+def build_label_prompt(texts):
+    return (
         "You are given a list of news article descriptions. "
         "Please respond with a **single word or short phrase** that summarizes the main topic of the cluster."
         "Do NOT include an 'Other', 'News', 'Headlines' or very general category names. \n\n"
         f"Articles:\n{texts}\n\n"
         "Topic label:"
     )
-    response = model.generate_content(prompt)
-    time.sleep(4.1)
-    return response.text.strip()
-
-def normalize_labels(unique_labels):
-    prompt = f"""
-    I have these news article cluster labels: {unique_labels}
-    
-    I want to merge duplicate into single categories.
-    
-    These labels need to describe the same topic, not just similar topics ("Legal/Political" and "Politics", "Basketball" and "NBA", etc.)
-    
-    Please provide a Python dictionary mapping each label to the most appropriate main category.
-    Only return the dictionary, no other text.
-    
-    Format: {{"original_label": "main_category", ...}}
-    """
-    response = model.generate_content(prompt)
-    time.sleep(4.1)
-    label_map = clean_labels(response.text)
-    return label_map
 
 
-def cluster_articles(method='kmeans', normalize=False, reduce_dim=False):
-    df = get_all_articles()
-    
-    # Define clusters
-    df['cluster_text'] = df['title'].fillna('') + '. ' + df['ext_summary'].fillna('')
-    st_model = SentenceTransformer('all-MiniLM-L6-v2')
-    embeddings = st_model.encode(df['cluster_text'].tolist())
-
+def fit_clusters(embeddings, method, reduce_dim):
+    """
+    Fit PCA/scaler and the clusterer from scratch. Returns the model state to
+    persist and the cluster id of every row. The state records the drift
+    baseline: mean distance to the assigned centroid (KMeans) or the outlier
+    fraction (HDBSCAN) at fit time.
+    """
+    pca = None
     if reduce_dim:
         pca = PCA(n_components=10, random_state=42)
         embeddings = pca.fit_transform(embeddings)
         
     scaler = StandardScaler()
     embeddings = scaler.fit_transform(embeddings)
-    df['embedding'] = embeddings.tolist()
 
     if method == 'hdbscan':
         clusterer = hdbscan.HDBSCAN(
             min_cluster_size=5,
             min_samples=1,
             metric='euclidean',
-            cluster_selection_epsilon=0.2
+            cluster_selection_epsilon=0.2,
+            prediction_data=True
         )
         
-        df['cluster'] = clusterer.fit_predict(embeddings)
+        clusters = clusterer.fit_predict(embeddings)
+        baseline = (clusters == -1).mean()
     
     else:
         n_clusters = 10
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        df['cluster'] = kmeans.fit_predict(embeddings)
-    
-    # Label clusters
-    cluster_labels = {}
-    unique_labels = set()
-    for cluster_id in sorted(df['cluster'].unique()):
-        cluster_summaries = df[df['cluster'] == cluster_id]['cluster_text'].tolist()
-        text_block = "\n".join(cluster_summaries)
-        label = label_cluster(text_block)
-        unique_labels.add(label)
-        cluster_labels[cluster_id] = label
-        
-    df['cluster_label'] = df['cluster'].map(cluster_labels)
+        clusterer = KMeans(n_clusters=n_clusters, random_state=42)
+        clusters = clusterer.fit_predict(embeddings)
+        baseline = clusterer.transform(embeddings).min(axis=1).mean()
+    
+    model = {
+        'method': method,
+        'reduce_dim': reduce_dim,
+        'pca': pca,
+        'scaler': scaler,
+        'clusterer': clusterer,
+        'baseline': baseline,
+        'versions': library_versions(),
+    }
+    return model, clusters
+
+
+def library_versions():
+    return {name: version(name) for name in MODEL_LIBRARIES}
+
+
+def load_cluster_model(method, reduce_dim):
+    """
+    The persisted model for `method`, or None when there is none, it cannot be
+    unpickled, or it was fitted with other settings or library versions
+    """
+    saved = get_cluster_model(method)
+    if not saved:
+        return None
+
+    try:
+        model = pickle.loads(saved)
+    except Exception as e:
+        print(f"Saved cluster model could not be loaded ({e!r}), refitting")
+        return None
+
+    if model.get('versions') != library_versions():
+        print(f"Saved cluster model was fitted with {model.get('versions')}, refitting")
+        return None
+    if model['reduce_dim'] != reduce_dim:
+        return None
+    return model
+
+
+def transform_embeddings(model, embeddings):
+    if model['pca'] is not None:
+        embeddings = model['pca'].transform(embeddings)
+    return model['scaler'].transform(embeddings)
+
+
+def assign_clusters(model, embeddings):
+    """
+    Cluster ids for already transformed embeddings, from the persisted model,
+    and whether they have drifted far enough from it to warrant a refit.
+    """
+    if model['method'] == 'hdbscan':
+        clusters, _ = hdbscan.approximate_predict(model['clusterer'], embeddings)
+        outliers = (clusters == -1).mean()
+        print(f"Outlier fraction {outliers:.2f} (fit: {model['baseline']:.2f})")
+        return clusters, outliers > max(OUTLIER_THRESHOLD, model['baseline'])
+    
+    distances = model['clusterer'].transform(embeddings)
+    clusters = distances.argmin(axis=1)
+    drift = distances.min(axis=1).mean() / model['baseline']
+    print(f"Mean centroid distance {drift:.2f}x the fit-time mean")
+    return clusters, drift > DRIFT_THRESHOLD
+
+
+def match_clusters(df, embeddings, previous_labels):
+    """
+    {cluster id: previous label} for new clusters that closely match a
+    cluster from the last run: centroids (in raw embedding space) with cosine
+    similarity of at least MATCH_SIMILARITY and member sets overlapping by MATCH_JACCARD.
+    Matching is one-to-one, best overlap first. Also returns the member overlap
+    (Jaccard) of every match.
+    """
+    def centroid(index):
+        vector = embeddings[df.index.get_indexer(index)].mean(axis=0)
+        return vector / (np.linalg.norm(vector) or 1)
+    
+    previous_labels = previous_labels.dropna()
+    old_groups = previous_labels.groupby(previous_labels).groups
+    old_centroids = {label: centroid(index) for label, index in old_groups.items()}
+    
+    candidates = []
+    for cluster_id, index in df.groupby('cluster').groups.items():
+        members = set(index)
+        new_centroid = centroid(index)
+        for label, old_index in old_groups.items():
+            old_members = set(old_index)
+            jaccard = len(members & old_members) / len(members | old_members)
+            if jaccard < MATCH_JACCARD:
+                continue
+            similarity = float(new_centroid @ old_centroids[label])
+            if similarity >= MATCH_SIMILARITY:
+                candidates.append((jaccard, similarity, cluster_id, label))
+    
+    matches, overlaps = {}, {}
+    for jaccard, similarity, cluster_id, label in sorted(candidates, reverse=True):
+        if cluster_id not in matches and label not in matches.values():
+            matches[cluster_id] = label
+            overlaps[cluster_id] = jaccard
+    return matches, overlaps
 
+
+def representative_articles(df, embeddings, cluster_ids, k=LABEL_SAMPLE_SIZE):
+    """The k articles closest to their cluster's centroid, for each of `cluster_ids`"""
+    ids, inverse = np.unique(df['cluster'].to_numpy(), return_inverse=True)
+    sums = np.zeros((len(ids), embeddings.shape[1]))
+    np.add.at(sums, inverse, embeddings)
+    centroids = sums / np.bincount(inverse)[:, None]
+    distances = np.linalg.norm(embeddings - centroids[inverse], axis=1)
+    
+    ranked = df.assign(centroid_distance=distances)
+    ranked = ranked[ranked['cluster'].isin(cluster_ids)].sort_values(['cluster', 'centroid_distance'], kind='stable')
+    return ranked.groupby('cluster').head(k)
+
+
+def build_labels_prompt(samples, normalize=False):
+    clusters = "\n\n".join(
+        f'<cluster id="{cluster_id}">\n' + "\n".join(f"- {text}" for text in texts) + "\n</cluster>"
+        for cluster_id, texts in samples.items()
+    )
+    merge = (
+        "Then merge labels that describe the same topic, not just similar topics "
+        '("Legal/Political" and "Politics", "Basketball" and "NBA", etc.), by mapping each label '
+        "to the most appropriate main category.\n"
+        if normalize else ""
+    )
+    return (
+        "You are given clusters of news article descriptions. For each cluster, give a "
+        "**single word or short phrase** that summarizes its main topic. "
+        "Do NOT include an 'Other', 'News', 'Headlines' or very general category names.\n"
+        f"{merge}"
+        'Respond with only a JSON object of the form {"labels": {"<cluster id>": "label", ...}, '
+        '"merge": {"label": "main category", ...}}.\n\n'
+        f"Clusters:\n{clusters}\n\n"
+        "JSON:"
+    )
+
+
+def label_clusters(df, embeddings, cluster_ids, normalize=False):
+    """
+    {cluster id: label} from one Gemini request showing the LABEL_SAMPLE_SIZE
+    articles closest to each centroid. With `normalize`, the same request
+    returns the label merge mapping. Clusters missing from the response are
+    labelled one request each.
+    """
+    if not cluster_ids:
+        return {}
+    
+    samples = {
+        str(cluster_id): group['cluster_text'].str.slice(0, LABEL_TEXT_CHARS).tolist()
+        for cluster_id, group in representative_articles(df, embeddings, cluster_ids).groupby('cluster')
+    }
+    client = get_client()
+    
+    labels, merge = {}, {}
+    try:
+        parsed = parse_json_object(client.generate(
+            build_labels_prompt(samples, normalize),
+            generation_config={"response_mime_type": "application/json"},
+            validate=lambda response: parse_json_object(response) is not None,
+        ))
+        if parsed is None:
+            print("Batched cluster labels were not a JSON object")
+    except Exception as e:
+        print(f"Error labelling clusters in one request: {e}")
+        parsed = None
+    
+    if parsed is not None:
+        labels = {
+            cluster_id: label.strip()
+            for cluster_id, label in (parsed.get('labels') or {}).items()
+            if cluster_id in samples and isinstance(label, str) and label.strip()
+        }
+        if isinstance(parsed.get('merge'), dict):
+            merge = parsed['merge']
+    
+    missing = [cluster_id for cluster_id in samples if cluster_id not in labels]
+    if missing:
+        print(f"Labelling {len(missing)} clusters missing from the batched response one by one")
+        prompts = [build_label_prompt("\n".join(samples[cluster_id])) for cluster_id in missing]
+        for cluster_id, response in zip(missing, client.generate_many(prompts)):
+            if isinstance(response, Exception):
+                raise response
+            labels[cluster_id] = response.strip()
+    
+    cluster_labels = {cluster_id: labels[str(cluster_id)] for cluster_id in cluster_ids}
     if normalize:
-        try:
-            label_map = normalize_labels(unique_labels)
-            df['cluster_label'] = df['cluster_label'].map(label_map).fillna(df['cluster_label'])
-        except Exception as e:
-            print(f"Error: {e}. Returning unnormalized labels.")
+        cluster_labels = {cluster_id: merge.get(label, label) for cluster_id, label in cluster_labels.items()}
+    return cluster_labels
+
+
+def cluster_articles(method='kmeans', normalize=False, reduce_dim=False, refit=False):
+    """
+    Assign new articles to the persisted cluster model; refit from scratch
+    only when there is no usable model, the settings changed, `refit` is set,
+    or the new articles have drifted from the model.
+    """
+    df = get_all_articles()
+    df['cluster_text'] = df['title'].fillna('') + '. ' + df['ext_summary'].fillna('')
+    
+    model = None if refit else load_cluster_model(method, reduce_dim)
+    
+    if model is not None:
+        new = df['cluster_label'].isna()
+        if not new.any():
+            print("No new articles to cluster")
+            return
+        
+        new_df = df[new].copy()
+        embeddings = transform_embeddings(model, embed_texts(new_df['url'], new_df['cluster_text']))
+        clusters, drifted = assign_clusters(model, embeddings)
+        
+        if not drifted:
+            new_df['embedding'] = embeddings.tolist()
+            new_df['cluster'] = clusters
+            new_df['cluster_label'] = new_df['cluster'].map(model['labels'])
+            print(new_df['cluster_label'].value_counts())
+            
+            update_article_clusters(new_df)
+            df.loc[new, 'cluster_label'] = new_df['cluster_label']
+            
+            print("Generating cluster summaries...")
+            generate_cluster_summaries(df['cluster_label'].dropna().unique(), df)
+            print("Done.")
+            return
+        
+        print("Cluster model has drifted, refitting")
+    
+    # Full refit on every article
+    embeddings = embed_texts(df['url'], df['cluster_text'])
+    model, df['cluster'] = fit_clusters(embeddings, method, reduce_dim)
+    transformed = transform_embeddings(model, embeddings)
+    df['embedding'] = transformed.tolist()
+    
+    # Clusters that match one from the last run keep its label, and unless their
+    # members changed heavily, its cluster_summaries row too; only the rest are
+    # labelled and summarized by Gemini
+    matches, overlaps = match_clusters(df, embeddings, df['cluster_label'])
+    inherited = {label for cluster_id, label in matches.items() if overlaps[cluster_id] >= RESUMMARIZE_JACCARD}
+    unmatched = sorted(set(df['cluster'].unique()) - set(matches))
+    print(f"Reusing {len(matches)} cluster labels, labelling {len(unmatched)} new clusters")
+    
+    model['labels'] = {**matches, **label_clusters(df, transformed, unmatched, normalize)}
+    df['cluster_label'] = df['cluster'].map(model['labels'])
 
     print(df['cluster_label'].unique())
     print(df['cluster_label'].value_counts())
     
-    replace_articles(df)
+    update_article_clusters(df)
+    save_cluster_model(method, pickle.dumps(model))
 
     print("Generating cluster summaries...")
-    for label in df['cluster_label'].unique():
-        generate_cluster_summary(label, df)
+    generate_cluster_summaries(df['cluster_label'].unique(), df, inherited)
     print("Done.")
 
 
-def generate_cluster_summary(cluster_label, articles_df):
-    cluster_arts = articles_df[articles_df['cluster_label'] == cluster_label]
-    if cluster_arts.empty:
-        return None
+def fingerprint(urls):
+    return hashlib.sha256("\n".join(sorted(urls)).encode('utf-8')).hexdigest()
+
+
+def sample_members(cluster_arts, k=SUMMARY_SAMPLE_SIZE):
+    """
+    The k members with the lowest url hash. Unlike a random sample, it only
+    changes when a new member hashes lower or a sampled one leaves.
+    """
+    rank = cluster_arts['url'].map(lambda url: hashlib.sha1(url.encode('utf-8')).hexdigest())
+    return cluster_arts.loc[rank.sort_values().index[:k]]
 
+
+def build_cluster_summary_prompt(sampled):
     articles_text = ""
-    sampled = cluster_arts.sample(n=min(8, len(cluster_arts)), random_state=42)
     for _, row in sampled.iterrows():
         summary = str(row.get("ext_summary", ""))[:200]
         articles_text += f"- {row['title']} ({row['source']}): {summary}\n"
 
-    prompt = (
+    return (
         "You are summarizing a news topic. Below are articles on the same subject.\n\n"
         f"Articles:\n{articles_text}\n\n"
         "Write a 4-5 sentence overview of what this topic covers, noting the main themes "
         "and any key developments. Be factual and concise. Do not use bullet points."
     )
 
-    try:
-        response = model.generate_content(prompt)
-        time.sleep(4.1)
-        summary_text = response.text.strip()
-        insert_cluster_summary(cluster_label, summary_text)
-        return summary_text
-    except Exception as e:
-        print(f"  Error generating summary for '{cluster_label}': {e}")
-        return None
+
+def generate_cluster_summaries(cluster_labels, articles_df, inherited=()):
+    """
+    Summarize several clusters concurrently and store each summary. A cluster
+    is skipped when its members are unchanged since its stored summary, and
+    only its fingerprints are updated when the members changed but the
+    sampled articles (and so the prompt) did not, or when it is one of the
+    `inherited` labels whose stored summary carries over a refit.
+    """
+    stored = get_cluster_fingerprints()
+    clusters = articles_df[articles_df['cluster_label'].isin(cluster_labels)]
+
+    prompts, fingerprints, kept = {}, {}, {}
+    for cluster_label, cluster_arts in clusters.groupby('cluster_label', sort=False):
+        member_fingerprint = fingerprint(cluster_arts['url'])
+        old_members, old_sample = stored.get(cluster_label, (None, None))
+        if member_fingerprint == old_members:
+            continue
+
+        sampled = sample_members(cluster_arts)
+        sample_fingerprint = fingerprint(sampled['url'])
+        if sample_fingerprint == old_sample or (cluster_label in inherited and cluster_label in stored):
+            kept[cluster_label] = (member_fingerprint, sample_fingerprint)
+            continue
+
+        fingerprints[cluster_label] = (member_fingerprint, sample_fingerprint)
+        prompts[cluster_label] = build_cluster_summary_prompt(sampled)
+
+    n_unchanged = clusters['cluster_label'].nunique() - len(prompts) - len(kept)
+    print(f"Cluster summaries: {len(prompts)} to generate, {len(kept)} kept with new members, {n_unchanged} unchanged")
+    if kept:
+        update_cluster_fingerprints(kept)
+
+    summaries = {}
+    responses = get_client().generate_many(list(prompts.values()))
+    for cluster_label, response in zip(prompts, responses):
+        if isinstance(response, Exception):
+            print(f"  Error generating summary for '{cluster_label}': {response}")
+            continue
+        summaries[cluster_label] = response.strip()
+        insert_cluster_summary(cluster_label, summaries[cluster_label], *fingerprints[cluster_label])
+    return summaries
 
 
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+import re
+import numpy as np
+from processors.extractive import split_sentences, build_matrix, rank_svd, MIN_SENTENCE_WORDS
+from processors.llm_client import estimate_tokens
+
+
+# Settings
+PROMPT_TOKEN_BUDGET = 800   # approximate article tokens sent to Gemini per summary
+
+# Lines scraped along with the article that say nothing about the story
+BOILERPLATE_PATTERNS = [
+    r'^advertisement$',
+    r'^(story|article) continues below',
+    r'^(sign up|subscribe)\b.*\b(newsletter|updates|email)',
+    r'^(read|see|watch) (more|also|next)\b',
+    r'^related( articles| stories| coverage)?:',
+    r'^(click|tap) here\b',
+    r'^follow (us|\w+) on\b',
+    r'^share (this|on)\b',
+    r'^(photo|image|video)( credit)?:',
+    r'^(copyright|©)',
+    r'all rights reserved',
+    r'^this (story|article) (has been|was) (updated|corrected)',
+]
+BOILERPLATE = re.compile('|'.join(BOILERPLATE_PATTERNS), re.IGNORECASE)
+
+
+def strip_boilerplate(text):
+    """Drop boilerplate and repeated lines, and squeeze whitespace"""
+    lines, seen = [], set()
+    for line in text.splitlines():
+        line = re.sub(r'\s+', ' ', line).strip()
+        if not line or BOILERPLATE.search(line) or line in seen:
+            continue
+        seen.add(line)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def select_sentences(text, token_budget):
+    """
+    Highest-ranked sentences that fit in the token budget, in their original
+    order. The lead sentence is always kept since it usually carries the story.
+    """
+    sentences = split_sentences(text)
+    if len(sentences) < 2:
+        return text[:token_budget * 4]
+
+    matrix, _ = build_matrix([sentences])
+    scores = rank_svd(matrix)
+    too_short = np.array([len(sentence.split()) < MIN_SENTENCE_WORDS for sentence in sentences])
+    scores = np.where(too_short, -np.inf, scores)
+    scores[0] = np.inf
+
+    chosen, used = [], 0
+    for i in np.argsort(-scores, kind='stable'):
+        if np.isneginf(scores[i]):
+            break
+        tokens = estimate_tokens(sentences[i])
+        if used + tokens > token_budget:
+            continue
+        chosen.append(i)
+        used += tokens
+
+    if not chosen:
+        return text[:token_budget * 4]
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+def compact_text(text, token_budget=PROMPT_TOKEN_BUDGET):
+    """Article text ready for a prompt: boilerplate stripped, then cut to the budget if needed"""
+    text = strip_boilerplate(text or "")
+    if estimate_tokens(text) <= token_budget:
+        return text
+    return select_sentences(text, token_budget)
+
+
+def compact_texts(texts, token_budget=PROMPT_TOKEN_BUDGET):
+    """Compact many article texts and print the token counts before and after"""
+    texts = list(texts)
+    compacted = [compact_text(text, token_budget) for text in texts]
+
+    before = sum(estimate_tokens(text or "") for text in texts)
+    after = sum(estimate_tokens(text) for text in compacted)
+    if texts:
+        print(f"Prompt compaction: {before} -> {after} tokens for {len(texts)} articles "
+              f"({1 - after / max(before, 1):.0%} saved)")
+
+    return compacted
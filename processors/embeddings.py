@@ -0,0 +1,55 @@
+import hashlib
+import numpy as np
+from database.db_client import get_embeddings, upsert_embeddings
+
+
+# Settings
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+ENCODE_BATCH_SIZE = 64
+
+_st_model = None
+
+
+def get_st_model():
+    """The SentenceTransformer, loaded only when something actually needs encoding"""
+    global _st_model
+    if _st_model is None:
+        from sentence_transformers import SentenceTransformer
+        _st_model = SentenceTransformer(EMBEDDING_MODEL)
+    return _st_model
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def embed_texts(urls, texts, model=EMBEDDING_MODEL):
+    """
+    float32 embedding matrix, one row per (url, text). Embeddings stored by an
+    earlier run are reused when the text hash still matches; only new or
+    changed texts are encoded, and those are written back to the store.
+    """
+    urls, texts = list(urls), list(texts)
+    hashes = [content_hash(text) for text in texts]
+
+    stored = get_embeddings(urls, model)
+    blobs = {url: blob for url, (stored_hash, blob) in stored.items()}
+    stale = [i for i, (url, h) in enumerate(zip(urls, hashes)) if stored.get(url, (None,))[0] != h]
+    print(f"Embeddings: {len(urls) - len(stale)} reused, {len(stale)} to encode")
+
+    if stale:
+        encoded = get_st_model().encode(
+            [texts[i] for i in stale],
+            batch_size=ENCODE_BATCH_SIZE,
+            convert_to_numpy=True,
+        ).astype(np.float32)
+
+        rows = [(urls[i], hashes[i], vector.tobytes()) for i, vector in zip(stale, encoded)]
+        upsert_embeddings(rows, model)
+        blobs.update((url, blob) for url, _, blob in rows)
+
+    # One contiguous buffer viewed as a matrix, rather than a Python list of arrays
+    if not urls:
+        return np.empty((0, 0), dtype=np.float32)
+    buffer = b''.join(blobs[url] for url in urls)
+    return np.frombuffer(buffer, dtype=np.float32).reshape(len(urls), -1)
@@ -0,0 +1,141 @@
+import re
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import svds
+
+
+# Settings
+TOPICS = 3                # latent topics kept when ranking by SVD
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 50
+MIN_SENTENCE_WORDS = 4    # shorter fragments (datelines, captions) are never picked
+
+SENTENCE_PATTERN = re.compile(r'(?:(?<=[.!?])|(?<=[.!?]["\'”’)\]]))\s+(?=["\'“‘(\[]?[A-Z0-9])')
+ABBREVIATIONS = frozenset("mr mrs ms dr sen rep gov gen lt col sgt st jr sr mt ft no vs inc corp co u.s u.k u.n".split())
+TOKEN_PATTERN = re.compile(r"[a-z][a-z'\-]+")
+STOP_WORDS = frozenset("""
+a about after again against all also am an and any are as at be because been before being between both
+but by can could did do does doing down during each few for from further had has have having he her
+here hers him his how i if in into is it its itself just me more most my no nor not now of off on once
+only or other our ours out over own said same she should so some such than that the their theirs them
+then there these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your
+""".split())
+
+
+def ends_with_abbreviation(sentence):
+    last_word = sentence.rsplit(None, 1)[-1].rstrip('.').lower()
+    return last_word in ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha())
+
+
+def split_sentences(text):
+    sentences = []
+    for paragraph in text.splitlines():
+        paragraph_start = len(sentences)
+        for sentence in SENTENCE_PATTERN.split(paragraph.strip()):
+            if not sentence:
+                continue
+            # "Dr. Smith" and "J. Doe" end a regex match but not a sentence
+            previous = sentences[-1] if len(sentences) > paragraph_start else ""
+            if previous.endswith('.') and ends_with_abbreviation(previous):
+                sentences[-1] = f"{sentences[-1]} {sentence}"
+            else:
+                sentences.append(sentence)
+    return sentences
+
+
+def tokenize(sentence):
+    return [token for token in TOKEN_PATTERN.findall(sentence.lower()) if token not in STOP_WORDS]
+
+
+def build_matrix(documents):
+    """
+    Sparse TF-IDF sentence-term matrix over every sentence of every document,
+    with one shared vocabulary. Returns the L2-normalised CSR matrix and the
+    row offset where each document starts.
+    """
+    vocabulary = {}
+    indices, indptr = [], [0]
+    offsets = [0]
+
+    for sentences in documents:
+        for sentence in sentences:
+            for token in tokenize(sentence):
+                indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            indptr.append(len(indices))
+        offsets.append(len(indptr) - 1)
+
+    data = np.ones(len(indices), dtype=np.float64)
+    matrix = sp.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(vocabulary)))
+    matrix.sum_duplicates()
+
+    # Sublinear term frequency times inverse sentence frequency
+    matrix.data = 1 + np.log(matrix.data)
+    sentence_freq = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1 + matrix.shape[0]) / (1 + sentence_freq)) + 1
+    matrix = matrix @ sp.diags(idf)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sp.diags(1 / norms) @ matrix
+    return matrix.tocsr(), offsets
+
+
+def rank_svd(matrix, topics=TOPICS):
+    """LSA sentence scores: length of each sentence vector in the top singular dimensions"""
+    # Only the terms this document uses matter
+    matrix = matrix[:, np.unique(matrix.indices)]
+    k = min(topics, min(matrix.shape) - 1)
+
+    if k < 1:
+        return np.asarray(matrix.sum(axis=1)).ravel()
+    if min(matrix.shape) <= 2 * topics:
+        u, s, _ = np.linalg.svd(matrix.toarray(), full_matrices=False)
+        u, s = u[:, :k], s[:k]
+    else:
+        u, s, _ = svds(matrix, k=k, v0=np.ones(min(matrix.shape)))
+
+    return np.sqrt(((u * s) ** 2).sum(axis=1))
+
+
+def rank_textrank(matrix, damping=TEXTRANK_DAMPING, iterations=TEXTRANK_ITERATIONS):
+    """PageRank over the cosine-similarity graph of sentences"""
+    similarity = (matrix @ matrix.T).tolil()
+    similarity.setdiag(0)
+    similarity = similarity.tocsr()
+
+    out_weight = np.asarray(similarity.sum(axis=1)).ravel()
+    out_weight[out_weight == 0] = 1
+    transition = (sp.diags(1 / out_weight) @ similarity).T.tocsr()
+
+    n = matrix.shape[0]
+    scores = np.full(n, 1 / n)
+    for _ in range(iterations):
+        scores = (1 - damping) / n + damping * (transition @ scores)
+    return scores
+
+
+def summarize_batch(texts, sentence_count=5, method='svd'):
+    """
+    Extractive summaries for many texts in one pass over a shared vocabulary.
+    Like summarize_ext, each summary is the top `sentence_count` sentences in
+    their original order, joined by spaces.
+    """
+    rank = rank_textrank if method == 'textrank' else rank_svd
+    documents = [split_sentences(text or "") for text in texts]
+    matrix, offsets = build_matrix(documents)
+
+    summaries = []
+    for doc_index, sentences in enumerate(documents):
+        if len(sentences) <= sentence_count:
+            summaries.append(" ".join(sentences))
+            continue
+
+        scores = rank(matrix[offsets[doc_index]:offsets[doc_index + 1]])
+        too_short = np.array([len(sentence.split()) < MIN_SENTENCE_WORDS for sentence in sentences])
+        scores = np.where(too_short, -np.inf, scores)
+
+        top = np.sort(np.argsort(-scores, kind='stable')[:sentence_count])
+        summaries.append(" ".join(sentences[i] for i in top))
+
+    return summaries
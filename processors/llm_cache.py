@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+CACHE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.cache', 'llm_cache.sqlite'))
+
+# Settings
+TTL = 30 * 24 * 60 * 60   # seconds before a cached response is ignored and evicted
+MAX_ENTRIES = 20000       # least recently used entries beyond this are evicted
+
+
+def prompt_key(model_name, prompt, **kwargs):
+    """SHA-256 of the model name, prompt and any generation options"""
+    payload = json.dumps([model_name, prompt, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent SQLite cache of LLM responses keyed by model name + prompt hash,
+    with TTL and size-based (LRU) eviction and hit/miss counters.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=TTL, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self.connection.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at > ?", (key, now - self.ttl)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+            return row[0]
+
+    def put(self, key, model_name, response):
+        now = time.time()
+        with self.lock:
+            self.connection.execute("""
+                INSERT OR REPLACE INTO responses (key, model, response, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, model_name, response, now, now))
+            self.connection.commit()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        with self.lock:
+            self.connection.execute("DELETE FROM responses WHERE created_at <= ?", (time.time() - self.ttl,))
+            self.connection.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self.connection.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        }
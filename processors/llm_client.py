@@ -0,0 +1,148 @@
+import asyncio
+import json
+import re
+import threading
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from config import GOOGLE_API_KEY
+from utils.rate_limiter import QuotaLimiter
+from processors.llm_cache import LLMCache, prompt_key
+
+
+MODEL_NAME = "gemini-2.5-flash"
+
+# Quota settings
+REQUESTS_PER_MINUTE = 10
+TOKENS_PER_MINUTE = 250000
+MAX_IN_FLIGHT = 4        # concurrent requests allowed while within quota
+MAX_RETRIES = 5
+BACKOFF_BASE = 2         # seconds, doubled per retry when no Retry-After is given
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token), good enough for packing prompts and quota tracking"""
+    return len(text) // 4 + 1
+
+
+def retry_after(error):
+    """Seconds the API asked us to wait, from a Retry-After header or the error's retry_delay"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    if headers.get('Retry-After'):
+        try:
+            return float(headers['Retry-After'])
+        except ValueError:
+            pass
+
+    match = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', str(error)) or \
+        re.search(r'retry in ([\d.]+)s', str(error), re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def parse_json_object(output_str):
+    """The JSON object in a JSON-mode response (code fences tolerated), or None if it is not one"""
+    cleaned = re.sub(r'```(?:json)?\s*', '', output_str).strip()
+    try:
+        parsed = json.loads(cleaned)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+class LLMClient:
+    """
+    Gemini client shared by the summarizer and clusterer. Requests run on a
+    background event loop, gated by one limiter for requests per minute and
+    one for tokens per minute, so several can be in flight up to the quota.
+    With an LLMCache, identical prompts are answered from disk; pass
+    `validate` to cache (and reuse) only responses it accepts.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, model=None, requests_per_minute=REQUESTS_PER_MINUTE,
+                 tokens_per_minute=TOKENS_PER_MINUTE, max_in_flight=MAX_IN_FLIGHT, cache=None):
+        if model is None:
+            genai.configure(api_key=GOOGLE_API_KEY)
+            model = genai.GenerativeModel(model_name)
+
+        self.model_name = model_name
+        self.model = model
+        self.cache = cache
+        self.request_limiter = QuotaLimiter(requests_per_minute)
+        self.token_limiter = QuotaLimiter(tokens_per_minute)
+        self.max_in_flight = max_in_flight
+
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.in_flight = asyncio.run_coroutine_threadsafe(self._make_semaphore(), self.loop).result()
+
+    async def _make_semaphore(self):
+        return asyncio.Semaphore(self.max_in_flight)
+
+    async def agenerate(self, prompt, validate=None, **kwargs):
+        key = prompt_key(self.model_name, prompt, **kwargs)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None and (validate is None or validate(cached)):
+                return cached
+
+        prompt_tokens = estimate_tokens(prompt)
+
+        for attempt in range(MAX_RETRIES + 1):
+            async with self.in_flight:
+                await self.request_limiter.acquire()
+                await self.token_limiter.acquire(prompt_tokens)
+                try:
+                    response = await self.model.generate_content_async(prompt, **kwargs)
+                except (google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable) as e:
+                    if attempt == MAX_RETRIES:
+                        raise
+                    delay = retry_after(e) or BACKOFF_BASE * 2 ** attempt
+                    print(f"Gemini unavailable ({e.code}), pausing all requests for {delay}s")
+                    self.request_limiter.pause(delay)
+                    continue
+
+            # Charge the response tokens too, once we know how many there were
+            usage = getattr(response, 'usage_metadata', None)
+            total_tokens = getattr(usage, 'total_token_count', 0) or 0
+            if total_tokens > prompt_tokens:
+                self.token_limiter.debit(total_tokens - prompt_tokens)
+
+            if self.cache is not None and (validate is None or validate(response.text)):
+                self.cache.put(key, self.model_name, response.text)
+            return response.text
+
+    def generate(self, prompt, **kwargs):
+        """Blocking single request; returns the response text"""
+        return asyncio.run_coroutine_threadsafe(self.agenerate(prompt, **kwargs), self.loop).result()
+
+    def generate_many(self, prompts, **kwargs):
+        """
+        Run many prompts concurrently within the quota. Returns texts in prompt
+        order; a prompt that failed comes back as its exception instead.
+        """
+        async def run_all():
+            return await asyncio.gather(*(self.agenerate(prompt, **kwargs) for prompt in prompts), return_exceptions=True)
+
+        return asyncio.run_coroutine_threadsafe(run_all(), self.loop).result()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide LLMClient, created on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(cache=LLMCache())
+        return _client
+
+
+def report_cache():
+    """Evict stale LLM cache entries and print this run's hit rate"""
+    if _client is not None and _client.cache is not None:
+        _client.cache.evict()
+        print(f"LLM cache: {_client.cache.stats()}")
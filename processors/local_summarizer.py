@@ -0,0 +1,98 @@
+import os
+import threading
+import torch
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+
+# Settings
+LOCAL_MODEL_NAME = "sshleifer/distilbart-cnn-12-6"   # news-tuned seq2seq that fits in CPU memory
+TORCH_THREADS = min(4, os.cpu_count() or 1)          # leave cores for the scrape and extractive pools
+QUANTIZE = True              # int8 dynamic quantization of the Linear layers
+MAX_INPUT_TOKENS = 1024      # model limit; longer inputs are truncated
+BATCH_TOKEN_BUDGET = 8192    # padded input tokens per generate() call
+MAX_BATCH_SIZE = 16
+NUM_BEAMS = 2
+MIN_SUMMARY_TOKENS = 40
+MAX_SUMMARY_TOKENS = 140
+
+
+def bucket_by_length(lengths, token_budget=BATCH_TOKEN_BUDGET, max_batch_size=MAX_BATCH_SIZE):
+    """
+    Group input indices into batches of similar length. Inputs are sorted by
+    length so padding stays small, and each batch grows until its padded size
+    (rows x longest input) would pass the token budget.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches, batch = [], []
+
+    for i in order:
+        # Sorted ascending, so the newcomer is the longest in the batch
+        padded = (len(batch) + 1) * lengths[i]
+        if batch and (padded > token_budget or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class LocalSummarizer:
+    """
+    Abstractive summaries from a small seq2seq model on CPU, for running
+    offline or once the Gemini quota is used up.
+    """
+
+    def __init__(self, model_name=LOCAL_MODEL_NAME, threads=TORCH_THREADS, quantize=QUANTIZE):
+        torch.set_num_threads(threads)
+
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+
+    def summarize_batch(self, encodings):
+        inputs = self.tokenizer.pad(encodings, return_tensors='pt')
+        with torch.inference_mode():
+            output = self.model.generate(
+                **inputs,
+                num_beams=NUM_BEAMS,
+                min_new_tokens=MIN_SUMMARY_TOKENS,
+                max_new_tokens=MAX_SUMMARY_TOKENS,
+                early_stopping=True,
+            )
+        return [summary.strip() for summary in self.tokenizer.batch_decode(output, skip_special_tokens=True)]
+
+    def summarize_many(self, texts):
+        """Summaries for many texts, in input order"""
+        texts = list(texts)
+        if not texts:
+            return []
+
+        encodings = [
+            self.tokenizer(text or "", truncation=True, max_length=MAX_INPUT_TOKENS)
+            for text in texts
+        ]
+        summaries = [None] * len(texts)
+
+        for batch in bucket_by_length([len(e['input_ids']) for e in encodings]):
+            for i, summary in zip(batch, self.summarize_batch([encodings[i] for i in batch])):
+                summaries[i] = summary
+
+        return summaries
+
+
+_local = None
+_local_lock = threading.Lock()
+
+
+def get_local_summarizer():
+    """The process-wide LocalSummarizer; the model is loaded on first use"""
+    global _local
+    with _local_lock:
+        if _local is None:
+            _local = LocalSummarizer()
+        return _local
@@ -1,7 +1,11 @@
 import pandas as pd
+import os
 import time
-import google.generativeai as genai
-from config import GOOGLE_API_KEY
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from processors.llm_client import get_client, estimate_tokens, parse_json_object
+from processors.extractive import summarize_batch
+from processors.compaction import compact_texts
 from sumy.parsers.plaintext import PlaintextParser
 from sumy.nlp.tokenizers import Tokenizer
 from sumy.summarizers.lsa import LsaSummarizer
@@ -9,36 +13,256 @@ import nltk
 nltk.download('punkt_tab')
 
 
-def summarize_abs(text, model):
-    prompt = (
+# Batched abstractive settings
+BATCH_TOKEN_BUDGET = 24000   # approximate input tokens per batched prompt
+MAX_BATCH_ARTICLES = 10
+MAX_BATCH_ATTEMPTS = 3       # rounds before leftover articles fall back to one call each
+EAGER_ABS = 'top'            # 'all' or 'top': which articles get an abstractive summary in the pipeline
+COMPACT_PROMPTS = True       # strip boilerplate and cap article tokens before prompting (see compaction.py)
+ABS_BACKEND = 'gemini'       # 'gemini', 'local' (CPU seq2seq model, see local_summarizer.py) or 'auto' (Gemini, local when it fails)
+
+# Extractive settings
+EXT_WORKERS = os.cpu_count()
+
+# Tokenizer and LSA summarizer are built once per process and reused for every article
+_ext_models = None
+
+
+def build_abs_prompt(text):
+    return (
         "Please summarize the following news article in 4-5 concise sentences.\n\n"
         f"Article:\n{text}\n\n"
         "Summary:"
     )
-    response = model.generate_content(prompt)
-    time.sleep(5)
-    return response.text.strip()
+
+
+def summarize_abs(text, client=None, compact=COMPACT_PROMPTS, backend=ABS_BACKEND):
+    if compact:
+        text = compact_texts([text])[0]
+    if backend == 'local':
+        return summarize_abs_local([text])[0]
+    
+    client = client or get_client()
+    try:
+        return client.generate(build_abs_prompt(text)).strip()
+    except Exception as e:
+        if backend != 'auto':
+            raise
+        print(f"Gemini failed ({e}), summarizing with the local model")
+        return summarize_abs_local([text])[0]
+
+
+def summarize_abs_local(texts):
+    """Abstractive summaries from the local CPU model, in input order"""
+    # Imported here so torch is only loaded when the local backend is used
+    from processors.local_summarizer import get_local_summarizer
+    
+    texts = list(texts)
+    started = time.perf_counter()
+    summaries = get_local_summarizer().summarize_many(texts)
+    report_throughput('local', len(texts), time.perf_counter() - started)
+    return summaries
+
+
+def report_throughput(backend, n_articles, seconds):
+    if n_articles:
+        print(f"Abstractive ({backend}): {n_articles} articles in {seconds:.1f}s "
+              f"({n_articles / max(seconds, 1e-9):.2f} articles/sec)")
+
+
+def pack_batches(articles, token_budget=BATCH_TOKEN_BUDGET, max_articles=MAX_BATCH_ARTICLES):
+    """Greedily group (id, text) pairs into batches under the token budget"""
+    batches = []
+    batch, batch_tokens = [], 0
+
+    for article_id, text in articles:
+        tokens = estimate_tokens(text)
+        if batch and (batch_tokens + tokens > token_budget or len(batch) >= max_articles):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append((article_id, text))
+        batch_tokens += tokens
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def build_batch_prompt(batch):
+    articles = "\n\n".join(f'<article id="{article_id}">\n{text}\n</article>' for article_id, text in batch)
+    return (
+        "Please summarize each of the following news articles in 4-5 concise sentences.\n"
+        "Respond with only a JSON object mapping each article id to its summary, "
+        'e.g. {"12": "Summary...", "15": "Summary..."}.\n\n'
+        f"Articles:\n{articles}\n\n"
+        "JSON:"
+    )
+
+
+def parse_batch_response(output_str, expected_ids):
+    """Summaries for the expected ids that came back as non-empty strings; anything else is dropped"""
+    parsed = parse_json_object(output_str)
+    if parsed is None:
+        print(f"Error parsing batch response: {output_str[:200]!r}")
+        return {}
+
+    return {
+        article_id: summary.strip()
+        for article_id, summary in parsed.items()
+        if article_id in expected_ids and isinstance(summary, str) and summary.strip()
+    }
+
+
+def summarize_abs_batch(texts, client=None):
+    """
+    Summarize many articles with one prompt per batch, all batches in flight
+    at once. `texts` maps article id to text. Ids missing or malformed in a
+    response are re-queued for the next round; whatever is left after
+    MAX_BATCH_ATTEMPTS is summarized one by one.
+    """
+    client = client or get_client()
+    pending = {str(article_id): text for article_id, text in texts.items()}
+    summaries = {}
+
+    for attempt in range(MAX_BATCH_ATTEMPTS):
+        batches = pack_batches(pending.items())
+        responses = client.generate_many(
+            [build_batch_prompt(batch) for batch in batches],
+            generation_config={"response_mime_type": "application/json"},
+            # Malformed JSON is re-queued as the same prompt, so it must not be cached
+            validate=lambda response: parse_json_object(response) is not None,
+        )
+
+        for batch, response in zip(batches, responses):
+            if isinstance(response, Exception):
+                print(f"Error summarizing batch of {len(batch)} articles: {response}")
+                continue
+            expected_ids = {article_id for article_id, _ in batch}
+            summaries.update(parse_batch_response(response, expected_ids))
+
+        pending = {article_id: text for article_id, text in pending.items() if article_id not in summaries}
+        if not pending:
+            break
+        print(f"Re-queueing {len(pending)} articles missing from batch responses")
+
+    if pending:
+        responses = client.generate_many([build_abs_prompt(text) for text in pending.values()])
+        for article_id, response in zip(pending, responses):
+            summaries[article_id] = None if isinstance(response, Exception) else response.strip()
+
+    return {article_id: summaries[str(article_id)] for article_id in texts}
+
+
+def get_ext_models():
+    global _ext_models
+    if _ext_models is None:
+        _ext_models = (Tokenizer("english"), LsaSummarizer())
+    return _ext_models
 
 
 def summarize_ext(text, sentence_count=5):
-    parser = PlaintextParser.from_string(text, Tokenizer("english"))
-    summarizer = LsaSummarizer()
+    tokenizer, summarizer = get_ext_models()
+    parser = PlaintextParser.from_string(text, tokenizer)
     summary = summarizer(parser.document, sentence_count)
     return " ".join(str(sentence) for sentence in summary)
 
 
-def summarize_articles(df):
-    genai.configure(api_key=GOOGLE_API_KEY)
-    model = genai.GenerativeModel("gemini-2.5-flash")
+def make_ext_pool(workers=EXT_WORKERS):
+    """
+    Process pool for summarize_ext_batch, to share across calls. Its workers
+    are started right away, so they fork before the LLM client starts its
+    event-loop thread.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=get_ext_models)
+    for future in [pool.submit(os.getpid) for _ in range(workers)]:
+        future.result()
+    return pool
+
+
+def summarize_ext_batch(texts, sentence_count=5, workers=EXT_WORKERS, pool=None):
+    """
+    Extractive summaries for many texts, split across a process pool. Pass a
+    pool from make_ext_pool to reuse it across calls. Results keep the input order.
+    """
+    texts = list(texts)
+    summarize = partial(summarize_ext, sentence_count=sentence_count)
+
+    if pool is None and (workers <= 1 or len(texts) < 2):
+        return [summarize(text) for text in texts]
+
+    chunksize = max(1, len(texts) // (workers * 4))
+    if pool is not None:
+        return list(pool.map(summarize, texts, chunksize=chunksize))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=get_ext_models) as pool:
+        return list(pool.map(summarize, texts, chunksize=chunksize))
+
+
+def summarize_abs_articles(texts, client=None, batched=True, compact=COMPACT_PROMPTS, backend=ABS_BACKEND):
+    """
+    Abstractive summaries for a Series of article texts, indexed like `texts`;
+    None where no backend produced one. `backend` picks the model (see ABS_BACKEND).
+    """
+    # Prompts get the compacted text; extractive summaries still use the full content
+    if compact:
+        texts = pd.Series(compact_texts(texts), index=texts.index)
+    
+    summaries = pd.Series(None, index=texts.index, dtype=object)
+    if backend == 'local':
+        summaries[:] = summarize_abs_local(texts)
+    else:
+        client = client or get_client()
+        started = time.perf_counter()
+        if batched:
+            summaries[:] = texts.index.map(summarize_abs_batch(texts.to_dict(), client))
+        else:
+            responses = client.generate_many([build_abs_prompt(text) for text in texts])
+            summaries[:] = [None if isinstance(r, Exception) else r.strip() for r in responses]
+        report_throughput('gemini', summaries.notna().sum(), time.perf_counter() - started)
+    
+    if backend == 'auto':
+        missing = summaries.isna()
+        if missing.any():
+            print(f"Summarizing {missing.sum()} articles Gemini could not with the local model")
+            summaries[missing] = summarize_abs_local(texts[missing])
+    
+    return summaries
+
+
+def summarize_articles(df, batched=True, ext_engine='sumy', eager_abs=EAGER_ABS, compact=COMPACT_PROMPTS,
+                       backend=ABS_BACKEND, client=None, ext_pool=None):
+    """
+    Add ext_summary for every article and abs_summary for the articles chosen
+    by `eager_abs` ('all' or 'top'); the rest are summarized on first view in
+    the app. Sets status to 'failed' where an eager abstractive summary is missing.
+    `ext_pool` (see make_ext_pool) runs the sumy extractive summaries.
+    """
+    eager = df['top'].fillna(False).astype(bool) if eager_abs == 'top' else pd.Series(True, index=df.index)
+    
+    df['abs_summary'] = summarize_abs_articles(df.loc[eager, 'content'], client, batched, compact, backend)
+    
+    if ext_engine == 'native':
+        df['ext_summary'] = summarize_batch(df['content'].tolist(), sentence_count=5)
+    else:
+        df['ext_summary'] = summarize_ext_batch(df['content'], sentence_count=5, pool=ext_pool)
     
-    df['abs_summary'] = df['content'].apply(lambda x: summarize_abs(x, model))
-    df['ext_summary'] = df['content'].apply(lambda x: summarize_ext(x, sentence_count=5))
+    df['status'] = 'done'
+    df.loc[eager & df['abs_summary'].isna(), 'status'] = 'failed'
     
     return df
 
 
+def lazy_abs_summary(url, content):
+    """Abstractive summary generated on first view and written back to news_pipeline"""
+    from database.db_client import update_abs_summary
+    
+    summary = summarize_abs(content)
+    update_abs_summary(url, summary)
+    return summary
+
+
 if __name__ == "__main__":
     from database.db_client import get_unprocessed_articles
     
     df = get_unprocessed_articles()
-    df = summarize_articles(df)
\ No newline at end of file
+    df = summarize_articles(df)
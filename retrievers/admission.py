@@ -0,0 +1,30 @@
+import re
+
+
+# Articles whose URL path marks them as live blogs or video pages are never worth scraping.
+# Whole path segments only, e.g. /live/ or /live-news/ but not /livestock-prices
+EXCLUDED_URL_PATTERN = re.compile(r'/(?:live|videos?)(?:[/?#-]|$)', re.IGNORECASE)
+
+
+def admit_candidates(df, known_urls):
+    """
+    Pre-scrape admission: dedupe NewsAPI results, apply the title/URL filters
+    and drop URLs already stored in news_pipeline, so only new, eligible
+    articles are scraped.
+    """
+    n_candidates = len(df)
+
+    df = df.dropna(subset=['url'])
+    df = df.sort_values(by='top', ascending=False, kind='stable')
+    df = df.drop_duplicates(subset='url', keep='first')
+    df = df.drop_duplicates(subset='title', keep='first')
+    df = df[~df['title'].str.contains('video', case=False, na=False)]
+    df = df[~df['url'].str.contains(EXCLUDED_URL_PATTERN, na=False)]
+
+    n_eligible = len(df)
+    df = df[~df['url'].isin(known_urls)]
+
+    print(f"Admitted {len(df)} of {n_candidates} candidates "
+          f"({n_candidates - n_eligible} duplicates/filtered, {n_eligible - len(df)} already stored)")
+
+    return df.reset_index(drop=True)
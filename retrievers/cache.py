@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import time
+
+
+CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.cache', 'scrape'))
+
+# Settings
+FRESH_FOR = 6 * 60 * 60         # seconds an entry is served without revalidation
+TTL = 7 * 24 * 60 * 60          # seconds before an entry is evicted outright
+MAX_BYTES = 200 * 1024 * 1024   # total cache size before least recently used entries go
+
+
+class ScrapeCache:
+    """
+    On-disk cache of extracted article text, one JSON file per URL named by
+    the URL's SHA-256. Entries keep the ETag/Last-Modified headers so stale
+    ones can be revalidated with a conditional GET instead of re-downloaded.
+    File mtimes track recency for LRU eviction.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, fresh_for=FRESH_FOR, ttl=TTL, max_bytes=MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.fresh_for = fresh_for
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evicted = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, url):
+        path = self._path(url)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry['fetched_at'] > self.ttl:
+            self._remove(path)
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry['fetched_at'] <= self.fresh_for
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, text, etag=None, last_modified=None):
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'url': url,
+            'text': text,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time(),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def refresh(self, url, entry):
+        """Mark a revalidated (304) entry as freshly fetched"""
+        self.put(url, entry['text'], entry.get('etag'), entry.get('last_modified'))
+
+    def touch(self, url):
+        try:
+            os.utime(self._path(url))
+        except OSError:
+            pass
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            self.evicted += 1
+        except OSError:
+            pass
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        entries = []
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.ttl:
+                    self._remove(path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'evicted': self.evicted,
+        }
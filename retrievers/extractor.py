@@ -0,0 +1,68 @@
+import re
+from lxml import html as lxml_html
+from newspaper import Article
+
+
+# Elements that never hold article body text
+BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'figure', 'button']
+
+# Settings
+MIN_PARAGRAPH_CHARS = 40   # shorter <p> blocks are usually captions, bylines or links
+MIN_TEXT_CHARS = 500       # fast output below this falls back to newspaper3k
+MIN_PARAGRAPHS = 3
+
+
+def decode_html(html, encoding=None):
+    if isinstance(html, str):
+        return html
+    return html.decode(encoding or 'utf-8', errors='replace')
+
+
+def extract_fast(html):
+    """Paragraph-based extraction with plain lxml, preferring the <article> element when present"""
+    tree = lxml_html.fromstring(html)
+    for element in list(tree.iter(*BOILERPLATE_TAGS)):
+        element.drop_tree()
+
+    articles = tree.xpath('//article')
+    root = max(articles, key=lambda a: len(a.text_content())) if articles else tree
+
+    paragraphs = []
+    for p in root.iter('p'):
+        text = re.sub(r'\s+', ' ', p.text_content()).strip()
+        if len(text) >= MIN_PARAGRAPH_CHARS:
+            paragraphs.append(text)
+
+    return "\n\n".join(paragraphs)
+
+
+def looks_poor(text):
+    return len(text) < MIN_TEXT_CHARS or text.count("\n\n") + 1 < MIN_PARAGRAPHS
+
+
+def parse_article(url, html):
+    article = Article(url)
+    article.set_html(html)
+    article.parse()
+    return article.text
+
+
+def extract_text(url, html, encoding=None):
+    """
+    Extract article text from raw HTML. Runs in a worker process, so it only
+    takes and returns plain picklable values.
+    """
+    html = decode_html(html, encoding)
+
+    try:
+        text = extract_fast(html)
+    except Exception:
+        text = ""
+
+    if looks_poor(text):
+        try:
+            text = parse_article(url, html)
+        except Exception as e:
+            print(f"Error parsing {url}: {e}")
+
+    return text
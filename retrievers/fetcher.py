@@ -1,45 +1,70 @@
 import pandas as pd
-import requests
-import time
-import os
-from dotenv import load_dotenv
-from newspaper import Article
-import psycopg2
-from config import *
-from database.db_client import insert_raw_articles
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from database.db_client import insert_raw_articles, get_known_urls, get_stored_contents, add_article_siblings, get_source_watermarks, update_source_watermarks
+from retrievers.admission import admit_candidates
+from retrievers.near_duplicates import build_index, collapse_near_duplicates
+from retrievers.scraper import scrape_many, EXTRACT_WORKERS
+from retrievers.cache import ScrapeCache
+from retrievers.health import DomainHealth
+from retrievers.newsapi import fetch_pages
 
 
-def scrape(url):
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/114.0.0.0 Safari/537.36"
-        ),
-        "Referer": "https://www.google.com",
-        "Accept-Language": "en-US,en;q=0.9",
-    }
-    
-    time.sleep(1)
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+def filter_content(df):
+    df = df[df['content'].str.len().between(1000, 12000)]
+    df = df[~df['content'].str.contains('live', case=False, na=False)]
+    return df.reset_index(drop=True)
 
-        article = Article(url)
-        article.set_html(response.text)
-        article.parse()
 
-        return article.text
+def scrape_batches(df, batch_size, cache=None, pool=None, rejections=None, health=None, retry_later=None):
+    """
+    Yield scraped and filtered slices of `df`, `batch_size` articles at a time.
+    Urls that failed for transient reasons are added to the `retry_later` set.
+    """
+    # Interleave sources so each batch spreads across hosts instead of queueing on one
+    order = df.groupby('source', sort=False).cumcount().sort_values(kind='stable').index
+    df = df.loc[order]
+    
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size].copy()
+        texts = scrape_many(
+            batch['url'].tolist(),
+            cache=cache,
+            pool=pool,
+            sources=dict(zip(batch['url'], batch['source'])),
+            rejections=rejections,
+            health=health,
+        )
+        batch['content'] = batch['url'].map(texts)
+        if retry_later is not None:
+            retry_later.update(batch.loc[batch['content'].isna(), 'url'])
+        yield filter_content(batch)
 
-    except Exception as e:
-        print(f"Error downloading/parsing {url}: {e}")
-        return ""
-    
-    
 
-def fetch_articles():    
-    url = 'https://newsapi.org/v2/everything'
-    
+def ingested_watermarks(df, retry_later, truncated=()):
+    """
+    {query: newest publish date the next run can skip} from every candidate
+    article of this run. Articles to retry hold their query's watermark back,
+    so it never moves past one of them, and `truncated` queries (a NewsAPI
+    page failed) keep their watermark as it was.
+    """
+    dates = pd.to_datetime(df['publish_date'], utc=True)
+    pending = df['url'].isin(retry_later)
+    
+    watermarks = {}
+    for query, query_dates in dates.groupby(df['query']):
+        if query in truncated:
+            continue
+        settled = query_dates[~pending]
+        retry_dates = query_dates[pending]
+        if not retry_dates.empty:
+            settled = settled[settled < retry_dates.min()]
+        if not settled.empty:
+            watermarks[query] = settled.max().to_pydatetime()
+    return watermarks
+
+
+def fetch_articles(batch_size=50):    
     # Settings
     category = 'politics'
     page_size = 5
@@ -75,93 +100,68 @@ def fetch_articles():
     
     
     
-    # Top Headlines
-    
-    top_url = 'https://newsapi.org/v2/top-headlines'
-    page_size = 5
-    max_top_articles = 20
+    # Top Headlines and per-source articles, requested concurrently through one rate limiter.
+    # Watermarks limit each query to articles newer than the last run ingested.
     top_sources = ",".join(sources)
-    
-    top_articles = []
-    
-    for page in range(1, (max_articles // page_size) + 1):
-        params = {
-            'apiKey': NEWS_API_KEY,
-            'sources': top_sources,
-            'pageSize': page_size,
-            'page': page,
-            'language': 'en',
-        }
-    
-    
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if response.status_code != 200 or 'articles' not in data:
-            print(f"Error on page {page}: {data.get('message', 'Unknown error')}")
-            break
-    
-        if not data['articles']:
-            break
-        
-        top_articles.extend(data['articles'])
-        
-        time.sleep(1)
+    max_pages = max_articles // page_size
+    queries = [top_sources] + sources
+    
+    watermarks = get_source_watermarks()
+    watermarks[top_sources] = watermarks.get('top')
+    
+    results = fetch_pages(queries, max_pages, page_size, watermarks)
+    top_articles = results[0][0]
+    all_articles = [article for source_articles, _ in results[1:] for article in source_articles]
+    # A query cut short by a failed page may have missed older articles, so its watermark stays put
+    truncated = {
+        'top' if query == top_sources else query
+        for query, (_, complete) in zip(queries, results) if not complete
+    }
+    if truncated:
+        print(f"Incomplete NewsAPI results for: {sorted(truncated)}")
         
     top_df = pd.DataFrame(top_articles)
     top_df['top'] = True
     
-    
-    
-    
-    # All other articles
-    all_articles = []
-    
-    for source in sources:    
-        for page in range(1, (max_articles // page_size) + 1):
-            params = {
-                'apiKey': NEWS_API_KEY,
-                'sources': source,
-                'pageSize': page_size,
-                'page': page,
-                'language': 'en',
-            }
-        
-        
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if response.status_code != 200 or 'articles' not in data:
-                print(f"Error on page {page}: {data.get('message', 'Unknown error')}")
-                break
-        
-            if not data['articles']:
-                break
-            
-            all_articles.extend(data['articles'])
-            
-            time.sleep(1)
-        
-        time.sleep(1)
-        
     all_df = pd.DataFrame(all_articles)
     all_df['top'] = False
     
     df = pd.concat([top_df, all_df], ignore_index=True)
+    if df.empty:
+        print("No new articles since the last run")
+        return
     
     df = df.rename(columns={'publishedAt': 'publish_date'})
     df['source'] = df['source'].apply(lambda x: x['id'])
     df['source_bias'] = df['source'].apply(get_bias_value)
-    df['content'] = df['url'].apply(scrape)
-    df = df.sort_values(by='top', ascending=False)
-    df = df.drop_duplicates(subset='url', keep='first')
-    df = df.drop_duplicates(subset='title', keep='first')
-    df = df[df['content'].str.len().between(1000, 12000)]
-    df = df[~df['content'].str.contains('live', case=False, na=False)]
-    df = df[~df['title'].str.contains('video', case=False, na=False)]
-    df = df.reset_index(drop=True)
-    
-    insert_raw_articles(df)
-
-
-
+    # Watermark key of the query each article came from
+    df['query'] = df['source'].where(~df['top'], 'top')
+    candidates = df
+    df = admit_candidates(df, get_known_urls())
+    
+    # Scrape, filter and insert in bounded batches so only one batch of text is in memory
+    # Near-duplicates (syndicated wire stories) are collapsed onto one canonical article,
+    # including canonicals stored by earlier runs
+    cache = ScrapeCache()
+    index = build_index(get_stored_contents())
+    rejections = Counter()
+    health = DomainHealth()
+    retry_later = set()
+    n_inserted = 0
+    with ProcessPoolExecutor(max_workers=EXTRACT_WORKERS) as pool:
+        for batch in scrape_batches(df, batch_size, cache, pool, rejections, health, retry_later):
+            batch, earlier_siblings = collapse_near_duplicates(batch, index)
+            insert_raw_articles(batch)
+            if earlier_siblings:
+                add_article_siblings(earlier_siblings)
+            n_inserted += len(batch)
+    
+    # Inserted and permanently rejected articles are settled; transient failures are fetched again next run
+    update_source_watermarks(ingested_watermarks(candidates, retry_later, truncated))
+    
+    cache.evict()
+    print(f"Scrape cache: {cache.stats()}")
+    print(f"Rejected downloads: {dict(rejections)}")
+    print("Per-domain scrape stats:")
+    print(pd.DataFrame(health.report()).to_string(index=False))
+    print(f"Inserted {n_inserted} of {len(df)} scraped articles")
@@ -0,0 +1,101 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+import aiohttp
+
+
+# Settings
+FAILURE_THRESHOLD = 3    # consecutive failures before a domain is skipped for the rest of the run
+BACKOFF_BASE = 1         # seconds, doubled on every consecutive failure
+BACKOFF_MAX = 30
+FAILURE_STATUSES = {403, 408, 429}   # plus any 5xx
+
+
+def is_domain_failure(error):
+    """Whether an error says the host is unhealthy, rather than something about one page"""
+    if getattr(error, 'rule', None) == 'deadline':
+        return True
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in FAILURE_STATUSES or error.status >= 500
+    return isinstance(error, (aiohttp.ClientConnectionError, TimeoutError))
+
+
+class DomainHealth:
+    """
+    Per-domain request stats with exponential backoff and a circuit breaker:
+    after FAILURE_THRESHOLD consecutive failures a domain is not requested
+    again for the rest of the run.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD):
+        self.failure_threshold = failure_threshold
+        self.stats = defaultdict(lambda: {
+            'requests': 0,
+            'failures': 0,
+            'consecutive_failures': 0,
+            'skipped': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0,
+            'open': False,
+        })
+
+    def is_open(self, host):
+        return self.stats[host]['open']
+
+    def backoff_delay(self, host):
+        failures = self.stats[host]['consecutive_failures']
+        if failures == 0:
+            return 0
+        return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (failures - 1))
+
+    def record_skip(self, host):
+        self.stats[host]['skipped'] += 1
+
+    def _record(self, host, latency):
+        stats = self.stats[host]
+        stats['requests'] += 1
+        stats['total_latency'] += latency
+        stats['max_latency'] = max(stats['max_latency'], latency)
+        return stats
+
+    def record_success(self, host, latency):
+        stats = self._record(host, latency)
+        stats['consecutive_failures'] = 0
+
+    def record_failure(self, host, latency):
+        stats = self._record(host, latency)
+        stats['failures'] += 1
+        stats['consecutive_failures'] += 1
+        if stats['consecutive_failures'] >= self.failure_threshold and not stats['open']:
+            stats['open'] = True
+            print(f"Circuit open for {host} after {stats['consecutive_failures']} consecutive failures")
+
+    @contextmanager
+    def track(self, host):
+        """Time a request and record it as a success or failure for `host`"""
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_domain_failure(e):
+                self.record_failure(host, time.monotonic() - started)
+            else:
+                self.record_success(host, time.monotonic() - started)
+            raise
+        else:
+            self.record_success(host, time.monotonic() - started)
+
+    def report(self):
+        """One row of latency/error stats per domain, worst first"""
+        rows = []
+        for host, stats in self.stats.items():
+            rows.append({
+                'domain': host,
+                'requests': stats['requests'],
+                'failures': stats['failures'],
+                'skipped': stats['skipped'],
+                'mean_latency': round(stats['total_latency'] / stats['requests'], 2) if stats['requests'] else None,
+                'max_latency': round(stats['max_latency'], 2),
+                'circuit_open': stats['open'],
+            })
+        return sorted(rows, key=lambda row: (row['failures'] + row['skipped'], row['max_latency']), reverse=True)
@@ -0,0 +1,105 @@
+import re
+import zlib
+from collections import defaultdict
+import numpy as np
+
+
+# Settings
+SHINGLE_SIZE = 5      # words per shingle
+NUM_PERM = 128        # MinHash signature length
+BANDS = 32            # LSH bands (NUM_PERM / BANDS rows each)
+THRESHOLD = 0.7       # estimated Jaccard similarity to count as a near-duplicate
+
+PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(42)
+_A = _rng.integers(1, PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, PRIME, NUM_PERM, dtype=np.uint64)
+
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < k:
+        words = words + [''] * (k - len(words))
+    shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) & PRIME for s in shingles), dtype=np.uint64)
+
+
+def minhash(text):
+    hashes = shingle_hashes(text)
+    return ((np.outer(hashes, _A) + _B) % PRIME).min(axis=0)
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index: each signature is bucketed per band, so lookups only compare against colliding documents"""
+
+    def __init__(self, threshold=THRESHOLD, bands=BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.buckets = defaultdict(list)
+        self.signatures = {}
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def query(self, signature):
+        """Most similar indexed key above the threshold, or None"""
+        candidates = {key for band_key in self._band_keys(signature) for key in self.buckets.get(band_key, ())}
+
+        best_key, best_score = None, self.threshold
+        for key in candidates:
+            score = np.mean(self.signatures[key] == signature)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self.buckets[band_key].append(key)
+
+
+def build_index(articles):
+    """NearDuplicateIndex seeded with (url, content) pairs, e.g. the articles already stored"""
+    index = NearDuplicateIndex()
+    for url, content in articles:
+        index.add(url, minhash(content))
+    return index
+
+
+def collapse_near_duplicates(df, index):
+    """
+    Keep one canonical article per near-duplicate group. Top headlines are
+    indexed first so they become the canonical copy, and a canonical that
+    absorbs a top headline is marked `top` itself. Canonical rows get the urls
+    of their siblings in a `siblings` column. Returns the canonical rows and a
+    {canonical_url: (sibling urls, any sibling top)} mapping for canonicals
+    indexed earlier (e.g. in a previous batch) that are not part of `df`.
+    """
+    df = df.sort_values(by='top', ascending=False, kind='stable')
+    keep = []
+    siblings = defaultdict(list)
+    top_siblings = set()
+
+    for row in df.itertuples():
+        signature = minhash(row.content)
+        canonical = index.query(signature)
+        if canonical is None:
+            index.add(row.url, signature)
+            keep.append(row.Index)
+        else:
+            siblings[canonical].append(row.url)
+            if row.top:
+                top_siblings.add(canonical)
+
+    df = df.loc[keep].copy()
+    df['siblings'] = df['url'].map(lambda url: siblings.pop(url, None))
+    df['top'] = df['top'] | df['url'].isin(top_siblings)
+
+    n_dropped = sum(len(urls) for urls in siblings.values()) + df['siblings'].dropna().str.len().sum()
+    if n_dropped:
+        print(f"Collapsed {n_dropped} near-duplicate articles")
+
+    earlier = {url: (urls, url in top_siblings) for url, urls in siblings.items()}
+    return df.reset_index(drop=True), earlier
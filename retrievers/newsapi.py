@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import aiohttp
+from config import NEWS_API_KEY
+from utils.rate_limiter import TokenBucket
+
+
+EVERYTHING_URL = 'https://newsapi.org/v2/everything'
+
+# Settings
+REQUESTS_PER_SECOND = 2   # sustained NewsAPI request rate
+BURST = 5                 # requests allowed back-to-back
+MAX_RETRIES = 3           # retries on 429 before giving up on a page
+BACKOFF_BASE = 2          # seconds, doubled on every retry
+
+
+def published_at(article):
+    return datetime.fromisoformat(article['publishedAt'].replace('Z', '+00:00'))
+
+
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying a 429, from Retry-After (seconds or an HTTP date) or our own backoff"""
+    header = response.headers.get('Retry-After')
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(header) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            pass
+    return BACKOFF_BASE * 2 ** attempt
+
+
+async def fetch_page(session, limiter, sources, page, page_size, since=None):
+    params = {
+        'apiKey': NEWS_API_KEY,
+        'sources': sources,
+        'pageSize': page_size,
+        'page': page,
+        'language': 'en',
+    }
+    if since is not None:
+        # Newest first, and nothing older than what we already ingested
+        params['from'] = since.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+        params['sortBy'] = 'publishedAt'
+
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.acquire()
+        try:
+            async with session.get(EVERYTHING_URL, params=params) as response:
+                if response.status == 429 and attempt < MAX_RETRIES:
+                    delay = retry_delay(response, attempt)
+                    print(f"Rate limited on {sources} page {page}, retrying in {delay}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                try:
+                    data = await response.json(content_type=None)
+                except ValueError:
+                    # Proxies and outages answer with HTML error pages
+                    print(f"Error on {sources} page {page}: HTTP {response.status} with a non-JSON body")
+                    return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error on {sources} page {page}: {e!r}")
+            return None
+
+        if response.status != 200 or not isinstance(data, dict) or 'articles' not in data:
+            message = data.get('message') if isinstance(data, dict) else None
+            print(f"Error on {sources} page {page}: {message or 'Unknown error'}")
+            return None
+
+        return data
+
+
+async def fetch_source(session, limiter, sources, max_pages, page_size, since=None):
+    """
+    Fetch page 1 of a source, then request the remaining pages it reports all at once.
+    A source stops at its first empty or failed page, and once results reach the
+    `since` watermark. Returns (articles, complete); `complete` is False when a
+    failed page cut the results short.
+    """
+    def is_new(article):
+        return since is None or published_at(article) > since
+
+    first = await fetch_page(session, limiter, sources, 1, page_size, since)
+    if first is None:
+        return [], False
+    if not first['articles']:
+        return [], True
+
+    articles = [article for article in first['articles'] if is_new(article)]
+    if len(articles) < len(first['articles']):
+        return articles, True
+
+    # totalResults tells us how many pages exist, so never ask for pages past it
+    total_pages = -(-first.get('totalResults', max_pages * page_size) // page_size)
+    last_page = min(max_pages, total_pages)
+
+    rest = await asyncio.gather(*(
+        fetch_page(session, limiter, sources, page, page_size, since) for page in range(2, last_page + 1)
+    ))
+
+    for data in rest:
+        if data is None:
+            return articles, False
+        if not data['articles']:
+            break
+        new_articles = [article for article in data['articles'] if is_new(article)]
+        articles.extend(new_articles)
+        if len(new_articles) < len(data['articles']):
+            break
+    return articles, True
+
+
+async def fetch_all(queries, max_pages, page_size, watermarks):
+    limiter = TokenBucket(REQUESTS_PER_SECOND, BURST)
+
+    async with aiohttp.ClientSession() as session:
+        return await asyncio.gather(*(
+            fetch_source(session, limiter, sources, max_pages, page_size, watermarks.get(sources))
+            for sources in queries
+        ))
+
+
+def fetch_pages(queries, max_pages, page_size, watermarks=None):
+    """
+    Fetch up to `max_pages` pages for every `sources` query concurrently, sharing
+    one rate limiter. `watermarks` maps a query to the newest publish date already
+    ingested for it; only newer articles are requested. Returns an (articles,
+    complete) pair per query, in the same order as `queries`; `complete` is
+    False when a failed page left the query's results incomplete.
+    """
+    return asyncio.run(fetch_all(queries, max_pages, page_size, watermarks or {}))
+
@@ -0,0 +1,192 @@
+import asyncio
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+import aiohttp
+from retrievers.extractor import extract_text
+from retrievers.health import DomainHealth
+
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/114.0.0.0 Safari/537.36"
+    ),
+    "Referer": "https://www.google.com",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Settings
+MAX_CONNECTIONS = 64   # pooled connections across all hosts
+MAX_PER_HOST = 4       # concurrent requests to a single publisher
+REQUEST_TIMEOUT = 10   # seconds
+EXTRACT_WORKERS = os.cpu_count()   # processes parsing HTML
+CHUNK_SIZE = 64 * 1024
+
+# Download limits, overridable per NewsAPI source id in SOURCE_LIMITS,
+# e.g. {'bbc-news': {'max_bytes': 4 * 1024 * 1024}}
+DEFAULT_LIMITS = {
+    'max_bytes': 2 * 1024 * 1024,   # pages larger than this are never articles we keep
+    'deadline': REQUEST_TIMEOUT,    # seconds for the whole download, body included
+    'content_types': ('text/html', 'application/xhtml+xml'),
+}
+SOURCE_LIMITS = {}
+
+# Rejections that may not happen on a later run, so the article is retried then
+TRANSIENT_RULES = {'deadline', 'circuit_open'}
+
+
+class PageRejected(Exception):
+    """A download stopped early by one of the DEFAULT_LIMITS rules"""
+
+    def __init__(self, rule, detail):
+        super().__init__(f"{rule}: {detail}")
+        self.rule = rule
+
+
+def get_limits(source):
+    return {**DEFAULT_LIMITS, **SOURCE_LIMITS.get(source, {})}
+
+
+def get_host(url):
+    """Publisher host used for per-host limits (www. prefix ignored)"""
+    host = urlparse(url).netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+async def read_bounded(response, limits):
+    """Stream the body, rejecting non-HTML responses and anything over the byte cap"""
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type and content_type not in limits['content_types']:
+        raise PageRejected('content_type', content_type)
+
+    if (response.content_length or 0) > limits['max_bytes']:
+        raise PageRejected('max_bytes', f"Content-Length {response.content_length}")
+
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        body.extend(chunk)
+        if len(body) > limits['max_bytes']:
+            raise PageRejected('max_bytes', f"over {limits['max_bytes']} bytes")
+    return bytes(body)
+
+
+async def download(session, url, host_limits, limits, health, cache=None):
+    """
+    Download one page. Returns (text, None) when the cache already has the
+    text, or (None, page) with the raw HTML bytes to be extracted.
+    """
+    entry = cache.get(url) if cache else None
+    if entry and cache.is_fresh(entry):
+        cache.hits += 1
+        cache.touch(url)
+        return entry['text'], None
+
+    headers = cache.conditional_headers(entry) if entry else {}
+    host = get_host(url)
+
+    def check_circuit():
+        if health.is_open(host):
+            health.record_skip(host)
+            raise PageRejected('circuit_open', host)
+
+    async with host_limits[host]:
+        # Don't hold the host slot through a backoff for a host that is already off;
+        # check again afterwards in case the circuit opened while we slept
+        check_circuit()
+        await asyncio.sleep(health.backoff_delay(host))
+        check_circuit()
+
+        with health.track(host):
+            try:
+                async with asyncio.timeout(limits['deadline']):
+                    async with session.get(url, headers=headers) as response:
+                        if response.status == 304 and entry:
+                            cache.revalidated += 1
+                            cache.refresh(url, entry)
+                            return entry['text'], None
+
+                        response.raise_for_status()
+                        page = {
+                            'html': await read_bounded(response, limits),
+                            'encoding': response.charset,
+                            'etag': response.headers.get('ETag'),
+                            'last_modified': response.headers.get('Last-Modified'),
+                        }
+                        return None, page
+            except TimeoutError:
+                raise PageRejected('deadline', f"not done after {limits['deadline']}s")
+
+
+async def scrape_one(session, url, host_limits, pool, limits, health, cache=None, rejections=None):
+    try:
+        text, page = await download(session, url, host_limits, limits, health, cache)
+        if page is None:
+            return text
+
+        # Parsing is CPU-bound, so it runs in the process pool while other downloads continue
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(pool, extract_text, url, page['html'], page['encoding'])
+
+        if cache:
+            cache.misses += 1
+            if text:
+                cache.put(url, text, page['etag'], page['last_modified'])
+
+        return text
+
+    except PageRejected as e:
+        if rejections is not None:
+            rejections[e.rule] += 1
+        print(f"Rejected {url}: {e}")
+        return None if e.rule in TRANSIENT_RULES else ""
+
+    except aiohttp.ClientResponseError as e:
+        print(f"Error downloading {url}: {e}")
+        # Client errors won't change on a retry; timeouts, throttling and server errors might
+        return "" if 400 <= e.status < 500 and e.status not in (408, 429) else None
+
+    except Exception as e:
+        print(f"Error downloading/parsing {url}: {e}")
+        return None
+
+
+async def scrape_all(urls, pool, sources, health, max_per_host=MAX_PER_HOST, cache=None, rejections=None):
+    host_limits = defaultdict(lambda: asyncio.Semaphore(max_per_host))
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS)
+
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector) as session:
+        texts = await asyncio.gather(*(
+            scrape_one(session, url, host_limits, pool, get_limits(sources.get(url)), health, cache, rejections)
+            for url in urls
+        ))
+
+    return dict(zip(urls, texts))
+
+
+def scrape_many(urls, max_per_host=MAX_PER_HOST, cache=None, pool=None, sources=None, rejections=None, health=None):
+    """
+    Download and parse many articles at once. Returns a {url: text} mapping;
+    text is "" for pages that will never yield an article and None for
+    failures worth retrying on a later run.
+    Pass a ScrapeCache to reuse and revalidate previously scraped pages, and a
+    ProcessPoolExecutor to share extraction workers across calls. `sources`
+    maps urls to NewsAPI source ids for per-source download limits, and
+    `rejections` (a Counter) collects how many pages each limit rejected.
+    Pass a DomainHealth to keep backoff and circuit state across calls.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    sources = sources or {}
+    health = health or DomainHealth()
+
+    if pool is not None:
+        return asyncio.run(scrape_all(urls, pool, sources, health, max_per_host, cache, rejections))
+
+    with ProcessPoolExecutor(max_workers=EXTRACT_WORKERS) as pool:
+        return asyncio.run(scrape_all(urls, pool, sources, health, max_per_host, cache, rejections))
@@ -6,6 +6,7 @@ import os
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 from database.db_client import get_cluster_summary
+from processors.summarizer import lazy_abs_summary
 
 load_dotenv(override=True)
 
@@ -58,6 +59,11 @@ def display_bias_scores(scores_vector, threshold=0.7):
         st.markdown(f"**Right:** {scores_vector.get('right-wing', 0):.1%}")
 
 
+@st.cache_data(show_spinner=False)
+def get_abs_summary(url, content):
+    return lazy_abs_summary(url, content)
+
+
 # ---------- CONNECT TO DATABASE ----------
 @st.cache_data(ttl=600)
 def get_articles():
@@ -546,7 +552,17 @@ if selected_id is not None:
     )
 
     if summary_type == "Abstractive":
-        st.write(article['abs_summary'])
+        if article['abs_summary']:
+            st.write(article['abs_summary'])
+        else:
+            # Not summarized by the pipeline yet: show the extractive summary while Gemini runs
+            summary_slot = st.empty()
+            summary_slot.write(article['ext_summary'])
+            with st.spinner("Generating summary..."):
+                try:
+                    summary_slot.write(get_abs_summary(article['url'], article['content']))
+                except Exception:
+                    st.caption("Abstractive summary unavailable, showing the extractive summary.")
     elif summary_type == "Extractive":
         st.write(article['ext_summary'])
 
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime, timezone
+import pandas as pd
+from retrievers import newsapi
+from retrievers.fetcher import ingested_watermarks
+
+
+def candidates(rows):
+    return pd.DataFrame(rows, columns=['url', 'query', 'publish_date'])
+
+
+def test_watermark_is_newest_settled_date():
+    df = candidates([
+        ('a', 'bbc-news', '2024-05-01T10:00:00Z'),
+        ('b', 'bbc-news', '2024-05-01T12:00:00Z'),
+        ('c', 'top', '2024-05-01T09:00:00Z'),
+    ])
+    assert ingested_watermarks(df, set()) == {
+        'bbc-news': datetime(2024, 5, 1, 12, tzinfo=timezone.utc),
+        'top': datetime(2024, 5, 1, 9, tzinfo=timezone.utc),
+    }
+
+
+def test_watermark_stops_below_articles_to_retry():
+    df = candidates([
+        ('a', 'bbc-news', '2024-05-01T10:00:00Z'),
+        ('b', 'bbc-news', '2024-05-01T11:00:00Z'),
+        ('c', 'bbc-news', '2024-05-01T12:00:00Z'),
+    ])
+    assert ingested_watermarks(df, {'b'}) == {'bbc-news': datetime(2024, 5, 1, 10, tzinfo=timezone.utc)}
+
+
+def test_truncated_query_keeps_its_watermark():
+    df = candidates([
+        ('a', 'bbc-news', '2024-05-01T10:00:00Z'),
+        ('b', 'reuters', '2024-05-01T12:00:00Z'),
+    ])
+    assert ingested_watermarks(df, set(), {'reuters'}) == {'bbc-news': datetime(2024, 5, 1, 10, tzinfo=timezone.utc)}
+
+
+def test_failed_later_page_marks_fetch_incomplete(monkeypatch):
+    pages = {
+        1: {'totalResults': 6, 'articles': [{'publishedAt': '2024-05-01T12:00:00Z'}] * 2},
+        2: None,
+        3: {'articles': [{'publishedAt': '2024-05-01T08:00:00Z'}] * 2},
+    }
+
+    async def fetch_page(session, limiter, sources, page, page_size, since=None):
+        return pages[page]
+
+    monkeypatch.setattr(newsapi, 'fetch_page', fetch_page)
+    articles, complete = asyncio.run(newsapi.fetch_source(None, None, 'reuters', 3, 2))
+    assert len(articles) == 2
+    assert not complete
+
+
+def test_full_fetch_is_complete(monkeypatch):
+    async def fetch_page(session, limiter, sources, page, page_size, since=None):
+        return {'totalResults': 4, 'articles': [{'publishedAt': '2024-05-01T12:00:00Z'}] * 2}
+
+    monkeypatch.setattr(newsapi, 'fetch_page', fetch_page)
+    articles, complete = asyncio.run(newsapi.fetch_source(None, None, 'reuters', 3, 2))
+    assert len(articles) == 4
+    assert complete
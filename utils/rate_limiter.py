@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket. Holds up to `capacity` tokens, refilled at `rate` tokens per second."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        # Requests larger than the bucket would never fit, so they just drain it
+        amount = min(amount, self.capacity)
+
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def debit(self, amount):
+        """Take tokens without waiting; the bucket may go negative so later callers wait it off"""
+        self._refill()
+        self.tokens -= amount
+
+    def pause(self, seconds):
+        """Hold off every caller for roughly `seconds`, e.g. after a Retry-After"""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class QuotaLimiter(TokenBucket):
+    """
+    Token bucket sized so that no 60 second window ever exceeds `per_minute`:
+    a burst of `burst_fraction` of the quota up front, the rest refilled evenly.
+    """
+
+    def __init__(self, per_minute, burst_fraction=0.2):
+        capacity = max(1, int(per_minute * burst_fraction))
+        super().__init__(rate=max(per_minute - capacity, 1) / 60, capacity=capacity)